@@ -0,0 +1,73 @@
+import numpy as np
+
+def adjacency_bits(adj):
+    """Neighbour sets of a boolean adjacency matrix as int bitmasks (bit j
+    of entry i set when i and j are adjacent), without self-loops."""
+    adj = np.asarray(adj, dtype=bool).copy()
+    np.fill_diagonal(adj, False)
+    return [int.from_bytes(np.packbits(row, bitorder='little').tobytes(), 'little') for row in adj]
+
+def _members(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+def maximal_cliques(neighbours):
+    """Every maximal clique of the graph given as int bitmasks (see
+    adjacency_bits), each as an ascending list of vertices.
+
+    Bron-Kerbosch with Tomita pivoting: only the candidates not adjacent to
+    the pivot (the vertex of P | X with the most neighbours in P) are
+    branched on, and set operations are single integer ANDs.
+    """
+    cliques = []
+
+    def expand(clique, p, x):
+        if not p and not x:
+            cliques.append(sorted(clique))
+            return
+        pivot = max(_members(p | x), key=lambda u: (p & neighbours[u]).bit_count())
+        for v in _members(p & ~neighbours[pivot]):
+            expand(clique + [v], p & neighbours[v], x & neighbours[v])
+            p &= ~(1 << v)
+            x |= 1 << v
+
+    expand([], (1 << len(neighbours)) - 1, 0)
+    return sorted(cliques)
+
+class CliqueSelection:
+    """Greedy subset selection inside one clique, kept across N: the picks
+    for N extend those for N - 1, so each step only adds one site and
+    promotes the clique's "covered t times" bitsets.
+
+    Each step takes the site bringing the most population to the set
+    covered at least k times (the first in clique order on ties, as the
+    original per-N loop did).
+    """
+
+    def __init__(self, coverage, population, clique, k):
+        self.full = coverage
+        self.population = population
+        self.clique = clique
+        self.coverage = coverage.select(clique)
+        self.taken = np.zeros(len(clique), dtype=bool)
+        self.selected = []
+        self.pops = [0]
+        self.reached = np.zeros((k + 1, coverage.bits.shape[1]), dtype=np.uint64)
+        self.reached[0] = coverage.everyone()
+        self.full_pop = coverage.population(coverage.at_least(clique, k), population) if len(clique) >= k else 0
+
+    def extend(self, n):
+        """(population covered k times, sites) of the first n picks."""
+        while len(self.selected) < n and not self.taken.all():
+            # Population each site would bring to the k-covered set
+            edge = self.reached[-2] & ~self.reached[-1]
+            gains = self.coverage.dot(np.where(self.full.unpack(edge), self.population, 0))
+            gains[self.taken] = -1
+            best = int(np.argmax(gains))
+            self.taken[best] = True
+            self.selected.append(self.clique[best])
+            self.reached[1:] |= self.reached[:-1] & self.full.bits[self.clique[best]]
+            self.pops.append(self.full.population(self.reached[-1], self.population))
+        return self.pops[len(self.selected)], self.selected[:n]
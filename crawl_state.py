@@ -0,0 +1,109 @@
+import json
+import os
+import random
+import threading
+import time
+
+CHECKPOINT_PATH = '.crawl_checkpoint.json'
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    # Full jitter: a random delay up to the exponential bound, so workers that
+    # were throttled together do not retry in lockstep.
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second on average with
+    bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class CrawlCheckpoint:
+    """Progress of one catalog crawl, persisted after every good page.
+
+    NextPageLink chains record how many pages they completed; $skip crawls
+    record the finished page numbers. The outputs are rebuilt from every
+    page, so a resumed crawl still walks the completed pages, replaying them
+    from the response cache (resume depends on it; a page missing from the
+    cache is downloaded again), and continues over the network from there.
+    With path=None progress is only tracked in memory.
+    """
+
+    def __init__(self, config=None, path=CHECKPOINT_PATH, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.failures = []
+        self.saved_at = 0.0
+        self.state = {"config": config, "chains": {}, "skip": {"done": [], "end": None}}
+        if resume and path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("config") == config:
+                self.state = saved
+            else:
+                print(f"{path} was written by a different crawl; starting over.")
+
+    def _save(self, force=False):
+        # At most one rewrite per second; a crash loses only pages that the
+        # response cache can still answer cheaply.
+        if self.path is None or (not force and time.monotonic() - self.saved_at < 1.0):
+            return
+        self.saved_at = time.monotonic()
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+    def chain(self, key):
+        with self.lock:
+            return dict(self.state["chains"].get(key, {"pages": 0}))
+
+    def advance(self, key, pages):
+        with self.lock:
+            self.state["chains"][key] = {"pages": pages}
+            self._save()
+
+    def skip_progress(self):
+        with self.lock:
+            return set(self.state["skip"]["done"]), self.state["skip"]["end"]
+
+    def page_done(self, page, end=None):
+        with self.lock:
+            self.state["skip"]["done"].append(page)
+            if end is not None:
+                self.state["skip"]["end"] = end
+            self._save()
+
+    def fail(self, where):
+        with self.lock:
+            self.failures.append(where)
+            self._save(force=True)
+
+    @property
+    def complete(self):
+        return not self.failures
+
+    def finish(self):
+        if self.path is None:
+            return
+        if not self.complete:
+            with self.lock:
+                self._save(force=True)
+        elif os.path.exists(self.path):
+            os.remove(self.path)
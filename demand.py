@@ -0,0 +1,117 @@
+import array
+import csv
+import gzip
+import hashlib
+import io
+import os
+import sys
+import numpy as np
+from matrix_cache import default_cache
+
+# Every solver reads its demand points from here; point DEMAND_PATH at a
+# 2010 Census Gazetteer places or counties file to optimize against it
+# instead.
+DEMAND_PATH = os.environ.get('DEMAND_PATH', 'cities.csv')
+
+# Accepted header names per column: cities.csv, then Census spellings. Only
+# the 2010 Gazetteer files carry population and coordinates together
+# (POP10, INTPTLAT, INTPTLONG). The 2020+ Gazetteer files have no
+# population and the POPESTIMATE/P1_001N tables no coordinates, so those
+# need a population join (on GEOID) into one file before they load.
+COLUMN_ALIASES = {
+    "name": ["city", "name", "NAME", "NAMELSAD", "GEONAME"],
+    "population": ["population", "POP", "POPULATION", "POP10", "POP100", "POPESTIMATE", "P1_001N"],
+    "lat": ["latitude", "lat", "INTPTLAT", "LATITUDE"],
+    "lon": ["longitude", "lon", "INTPTLONG", "LONGITUDE"],
+}
+
+class Demand:
+    """Demand points as contiguous columns: names, population (int64) and
+    lat/lon (float32). Solvers index the arrays directly instead of a list
+    of per-row dicts."""
+
+    def __init__(self, names, population, lat, lon):
+        self.names = names
+        self.population = population
+        self.lat = lat
+        self.lon = lon
+
+    def __len__(self):
+        return len(self.population)
+
+    def __getitem__(self, rows):
+        """The subset of points selected by a slice or index array."""
+        return Demand(self.names[rows], self.population[rows], self.lat[rows], self.lon[rows])
+
+    @property
+    def total(self):
+        return int(self.population.sum())
+
+    def points(self):
+        """(lat, lon) as float64 arrays for the distance code."""
+        return self.lat.astype(np.float64), self.lon.astype(np.float64)
+
+def _open(path):
+    if path.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(path), encoding='utf-8', newline='')
+    return open(path, 'r', encoding='utf-8', newline='')
+
+def _column(header, key):
+    for alias in COLUMN_ALIASES[key]:
+        if alias in header:
+            return header.index(alias)
+    hint = ""
+    if key == "population" and "INTPTLAT" in header:
+        hint = "; 2020+ Gazetteer files have no population, join one in on GEOID first"
+    raise ValueError(f"no {key} column (tried {', '.join(COLUMN_ALIASES[key])}){hint}")
+
+def read_demand(path):
+    """Stream a CSV or tab-separated (Gazetteer .txt) file into a Demand,
+    keeping only the four columns it needs. Rows without a usable
+    population or coordinate are skipped."""
+    with _open(path) as f:
+        first = f.readline()
+        delimiter = '\t' if '\t' in first else ','
+        header = [h.strip() for h in next(csv.reader([first], delimiter=delimiter))]
+        cols = [_column(header, key) for key in ("name", "population", "lat", "lon")]
+        names = []
+        population = array.array('q')
+        lat, lon = array.array('f'), array.array('f')
+        skipped = 0
+        for row in csv.reader(f, delimiter=delimiter):
+            try:
+                name, pop, la, lo = (row[i].strip() for i in cols)
+                pop, la, lo = int(float(pop)), float(la), float(lo)
+            except (IndexError, ValueError):
+                skipped += 1
+                continue
+            names.append(name)
+            population.append(pop)
+            lat.append(la)
+            lon.append(lo)
+    if skipped:
+        print(f"{path}: skipped {skipped} rows without population or coordinates", file=sys.stderr)
+    return Demand(np.array(names, dtype=str), np.frombuffer(population, dtype=np.int64),
+                  np.frombuffer(lat, dtype=np.float32), np.frombuffer(lon, dtype=np.float32))
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def load_demand(path=None, cache=None):
+    """Demand points from `path` (default DEMAND_PATH). The parsed columns
+    are kept in the matrix cache under the file's content hash, so later
+    runs memory-map them instead of re-parsing the text."""
+    path = path or DEMAND_PATH
+    cache = cache or default_cache()
+    parts = {"kind": "demand", "source": file_digest(path), "columns": COLUMN_ALIASES}
+
+    def build():
+        d = read_demand(path)
+        return {"names": d.names, "population": d.population, "lat": d.lat, "lon": d.lon}, None
+
+    arrays, _ = cache.cached(parts, build)
+    return Demand(arrays["names"], arrays["population"], arrays["lat"], arrays["lon"])
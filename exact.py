@@ -0,0 +1,116 @@
+import numpy as np
+from scipy.optimize import milp, LinearConstraint, Bounds
+from scipy.sparse import coo_matrix
+
+MILP_STATUS = {0: "optimal", 1: "time limit", 2: "infeasible", 3: "unbounded", 4: "solver error"}
+
+def _pairs(coverage):
+    """(city, site) index arrays of every covered pair."""
+    cities = [coverage.cities(site) for site in range(len(coverage.bits))]
+    sites = [np.full(len(c), site, dtype=np.int64) for site, c in enumerate(cities)]
+    if not cities:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(cities), np.concatenate(sites)
+
+def meets(coverage, sites, population, k, target, vendors=None, min_vendors=1):
+    """Whether `sites` (repeats allowed) covers `target` of the population
+    k times over, from at least min_vendors vendors per covered city."""
+    ok = coverage.counts(sites) >= k
+    if vendors is not None and min_vendors > 1:
+        vendors = np.asarray(vendors)
+        distinct = np.zeros(coverage.num_cities, dtype=np.int64)
+        for v in np.unique(vendors[list(sites)]):
+            distinct += coverage.counts([s for s in sites if vendors[s] == v]) > 0
+        ok &= distinct >= min_vendors
+    population = np.asarray(population, dtype=np.int64)
+    return population[ok].sum() >= target * population.sum()
+
+def solve_exact(coverage, population, prices, k, target, vendors=None, min_vendors=1, risks=None, max_risk=None,
+                incumbent=None, time_limit=60.0, gap=1e-4):
+    """Minimum-cost sites (repeats allowed) covering `target`, a fraction of
+    the population, at least k times, solved as an integer program:
+
+        min  sum_i price_i x_i
+        s.t. sum_i C_ji x_i >= k y_j                  every city j
+             sum_j pop_j y_j >= target * total
+             z_jv <= sum_{i of vendor v} C_ji x_i      every city j, vendor v
+             sum_v z_jv >= min_vendors y_j
+             x_i = 0 where risk_i > max_risk
+             x_i in 0..k; y_j, z_jv in {0, 1}
+
+    The vendor rows are only added when min_vendors > 1. HiGHS takes no
+    starting point, so `incumbent` (the greedy selection) seeds the search
+    as a cost cutoff instead: only cheaper solutions are explored, and it
+    is returned if nothing better turns up within time_limit seconds. The
+    search stops once the relative gap to the lower bound is within `gap`.
+
+    Returns a dict with the chosen sites, their cost, the lower bound, the
+    relative gap and the solver status.
+    """
+    population = np.asarray(population, dtype=np.float64)
+    prices = np.asarray(prices, dtype=np.float64)
+    num_cities, num_sites = coverage.shape
+    pair_city, pair_site = _pairs(coverage)
+    y = num_sites + np.arange(num_cities)
+    rows = [pair_city, np.arange(num_cities), np.full(num_cities, num_cities)]
+    cols = [pair_site, y, y]
+    vals = [np.ones(len(pair_city)), np.full(num_cities, -float(k)), population]
+    lower = [np.zeros(num_cities), [target * population.sum()]]
+    upper = [np.full(num_cities, np.inf), [np.inf]]
+    num_rows, num_vars = num_cities + 1, num_sites + num_cities
+
+    if vendors is not None and min_vendors > 1:
+        _, vendor = np.unique(np.asarray(vendors, dtype=str), return_inverse=True)
+        # One z per (city, vendor) pair the vendor reaches at all.
+        keys, pair_z = np.unique(pair_city * (vendor.max() + 1) + vendor[pair_site], return_inverse=True)
+        num_z = len(keys)
+        z = num_vars + np.arange(num_z)
+        z_city = keys // (vendor.max() + 1)
+        reach_rows = num_rows + np.arange(num_z)
+        mix_rows = num_rows + num_z + z_city
+        rows += [reach_rows, num_rows + pair_z, mix_rows, num_rows + num_z + np.arange(num_cities)]
+        cols += [z, pair_site, z, y]
+        vals += [np.ones(num_z), -np.ones(len(pair_site)), np.ones(num_z), np.full(num_cities, -float(min_vendors))]
+        lower += [np.full(num_z, -np.inf), np.zeros(num_cities)]
+        upper += [np.zeros(num_z), np.full(num_cities, np.inf)]
+        num_rows += num_z + num_cities
+        num_vars += num_z
+
+    best, best_cost = None, np.inf
+    if incumbent is not None and meets(coverage, incumbent, population.astype(np.int64), k, target, vendors, min_vendors) \
+            and not (risks is not None and max_risk is not None and any(risks[i] > max_risk for i in incumbent)):
+        best, best_cost = list(incumbent), float(prices[list(incumbent)].sum())
+        rows.append(np.full(num_sites, num_rows))
+        cols.append(np.arange(num_sites))
+        vals.append(prices)
+        lower.append([-np.inf])
+        upper.append([best_cost * (1 + 1e-9)])
+        num_rows += 1
+
+    constraints = LinearConstraint(
+        coo_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=(num_rows, num_vars)).tocsr(),
+        np.concatenate(lower), np.concatenate(upper))
+    x_upper = np.ones(num_vars)
+    x_upper[:num_sites] = k
+    if risks is not None and max_risk is not None:
+        x_upper[:num_sites][np.asarray(risks) > max_risk] = 0
+    c = np.zeros(num_vars)
+    c[:num_sites] = prices
+    res = milp(c, integrality=np.ones(num_vars), bounds=Bounds(np.zeros(num_vars), x_upper), constraints=constraints,
+               options={"time_limit": time_limit, "mip_rel_gap": gap, "disp": False})
+
+    if res.x is not None:
+        counts = np.rint(res.x[:num_sites]).astype(np.int64)
+        cost = float(prices @ counts)
+        if cost < best_cost:
+            best, best_cost = list(np.repeat(np.arange(num_sites), counts)), cost
+    bound = res.mip_dual_bound if res.status in (0, 1) and res.mip_dual_bound is not None else None
+    if res.status == 0 and bound is None:
+        bound = best_cost
+    status = MILP_STATUS.get(res.status, "solver error")
+    if res.status == 2 and best is not None:
+        # The cutoff excluded everything but the incumbent: nothing is cheaper.
+        status, bound = "optimal", best_cost
+    gap_found = (best_cost - bound) / best_cost if best is not None and bound is not None and best_cost > 0 else None
+    return {"sites": best, "cost": best_cost if best is not None else None, "bound": bound, "gap": gap_found,
+            "status": status, "message": res.message}
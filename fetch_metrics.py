@@ -0,0 +1,102 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+class FetchMetrics:
+    """Thread-safe counters for one refresh.
+
+    Pages record latency, response size, HTTP status, where the body came
+    from (network, 304 revalidation or cache replay) and retries. Phases
+    accumulate busy time per stage (network, json, classify, one per sink),
+    summed across worker threads, so they can exceed the wall-clock total.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.pages = []
+        self.phases = {}
+        self.rows = 0
+        self.retries = 0
+        self.providers = {}
+        self._progress = None
+
+    def page(self, url, seconds, size, status, source, retries=0):
+        with self.lock:
+            self.pages.append({"url": url, "seconds": round(seconds, 6), "bytes": size,
+                               "status": status, "source": source, "retries": retries})
+            self.retries += retries
+
+    def add_phase(self, name, seconds):
+        with self.lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.monotonic() - start)
+
+    def add_rows(self, n):
+        with self.lock:
+            self.rows += n
+
+    def summary(self):
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            latencies = [p["seconds"] for p in self.pages if p["source"] != "cache"]
+            by_source = {}
+            for p in self.pages:
+                by_source[p["source"]] = by_source.get(p["source"], 0) + 1
+            return {
+                "elapsed_seconds": round(elapsed, 3),
+                "rows": self.rows,
+                "rows_per_second": round(self.rows / elapsed, 1) if elapsed else None,
+                "pages": len(self.pages),
+                "pages_by_source": by_source,
+                "bytes": sum(p["bytes"] for p in self.pages),
+                "retries": self.retries,
+                "page_latency": {
+                    "p50": _percentile(latencies, 0.50), "p90": _percentile(latencies, 0.90),
+                    "p99": _percentile(latencies, 0.99), "max": max(latencies, default=None),
+                },
+                "phase_seconds": {k: round(v, 3) for k, v in sorted(self.phases.items())},
+                "provider_seconds": {k: round(v, 3) for k, v in self.providers.items()},
+                "page_log": list(self.pages),
+            }
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def start_progress(self, interval):
+        """Print a one-line status to stderr every `interval` seconds until
+        stop_progress()."""
+        stop = threading.Event()
+
+        def report():
+            while not stop.wait(interval):
+                with self.lock:
+                    elapsed = time.monotonic() - self.started
+                    pages, rows = len(self.pages), self.rows
+                    size = sum(p["bytes"] for p in self.pages)
+                print(f"[{elapsed:7.1f}s] {pages} pages, {rows} rows ({rows / elapsed:.0f}/s), "
+                      f"{size / 1e6:.1f} MB, {self.retries} retries", file=sys.stderr)
+
+        self._progress = stop
+        threading.Thread(target=report, daemon=True).start()
+
+    def stop_progress(self):
+        if self._progress is not None:
+            self._progress.set()
+            self._progress = None
@@ -1,42 +1,310 @@
 import json
 import urllib.request
+import urllib.error
+import sys
 import csv
-import sqlite3
 import os
 import time
 import urllib.parse
+import argparse
+import gzip
+import http.client
+import threading
+import queue
+import itertools
 
-def get_json(url):
+from price_db import PriceWriter
+from price_snapshot import SnapshotWriter
+from response_cache import CACHE_DIR, ResponseCache
+from crawl_state import CHECKPOINT_PATH, CrawlCheckpoint, TokenBucket, backoff_delay
+from fetch_metrics import FetchMetrics
+from providers import PROVIDERS, JsonApiProvider, PriceProvider, ProviderRun, register_provider
+
+AZURE_PRICES_URL = "https://prices.azure.com/api/retail/prices"
+AZURE_BASE_FILTER = "priceType eq 'Consumption'"
+AZURE_PAGE_SIZE = 100
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+
+# Shared by every fetch path; set by configure_fetch() from main().
+_cache = None
+_limiter = None
+_max_retries = MAX_RETRIES
+_metrics = FetchMetrics()
+
+def configure_fetch(cache=None, rate=None, burst=None, retries=MAX_RETRIES, metrics=None):
+    """Install the response cache, a token-bucket rate limit (requests per
+    second across all workers), the per-request retry budget and the
+    FetchMetrics that pages and phases are recorded into."""
+    global _cache, _limiter, _max_retries, _metrics
+    _cache = cache
+    _limiter = TokenBucket(rate, burst) if rate else None
+    _max_retries = retries
+    _metrics = metrics or FetchMetrics()
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('Retry-After', 0))
+    except (TypeError, ValueError):
+        return 0.0
+
+def _download(url, transport):
+    extra = _cache.conditional_headers(url) if _cache is not None else {}
+    error = None
+    for attempt in range(_max_retries + 1):
+        if attempt:
+            time.sleep(delay)
+        if _limiter is not None:
+            _limiter.acquire()
+        start = time.monotonic()
+        try:
+            with _metrics.phase("network"):
+                status, body, headers = transport(url, extra)
+        except (http.client.HTTPException, OSError) as e:
+            error, delay = e, backoff_delay(attempt)
+            continue
+        if status in RETRY_STATUSES:
+            error, delay = f"HTTP {status}", max(backoff_delay(attempt), _retry_after(headers))
+            continue
+        seconds = time.monotonic() - start
+        if status == 304 and _cache is not None:
+            _metrics.page(url, seconds, 0, status, "revalidated", attempt)
+            body = _cache.load(url)
+            if body is None:
+                print(f"GET {url}: 304 for a page missing from the cache", file=sys.stderr)
+            return body
+        _metrics.page(url, seconds, len(body), status, "network", attempt)
+        if status != 200:
+            print(f"GET {url} returned HTTP {status}", file=sys.stderr)
+            return None
+        if _cache is not None:
+            _cache.store(url, body, headers.get('ETag'), headers.get('Last-Modified'))
+        return body
+    _metrics.page(url, 0.0, 0, None, "failed", _max_retries)
+    print(f"GET {url} failed after {_max_retries + 1} attempts: {error}", file=sys.stderr)
+    return None
+
+def _fetch_json(url, transport, replay=False):
+    # replay: the page is known to be cached by an earlier run of this crawl,
+    # so it is read back without revalidating.
+    body = None
+    if _cache is not None and (_cache.offline or replay):
+        start = time.monotonic()
+        body = _cache.load(url)
+        if body is None and _cache.offline:
+            print(f"offline: no cached response for {url}", file=sys.stderr)
+            return None
+        if body is not None:
+            _metrics.page(url, time.monotonic() - start, len(body), None, "cache")
+    if body is None:
+        body = _download(url, transport)
+        if body is None:
+            return None
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'application/json',
-        }
-        req = urllib.request.Request(url, headers=headers)
-        with urllib.request.urlopen(req, timeout=20) as response:
-            return json.loads(response.read().decode('utf-8'))
-    except Exception as e:
+        with _metrics.phase("json"):
+            return json.loads(body.decode('utf-8'))
+    except ValueError as e:
+        print(f"GET {url}: bad JSON: {e}", file=sys.stderr)
         return None
 
-def fetch_azure_deep():
-    results = []
-    base_url = "https://prices.azure.com/api/retail/prices"
-    query = "$filter=priceType eq 'Consumption'"
-    url = f"{base_url}?{urllib.parse.quote(query, safe='=$&')}"
-    for page in range(30):
-        data = get_json(url)
-        if not data or 'Items' not in data: break
-        for item in data['Items']:
-            sku = item.get("armSkuName", "")
-            service = item.get("serviceName", "").lower()
-            category = "cpu"
-            if "gpu" in service or any(x in sku for x in ["ND", "NC"]): category = "gpu"
-            elif "storage" in service: category = "storage"
-            elif "backup" in service: category = "backup"
-            results.append({"supplier": "Azure", "region": item.get("armRegionName", "Global"), "instance_type": sku, "category": category, "price": float(item.get("retailPrice", 0.0))})
+def _urlopen(url, extra_headers, timeout=20):
+    req = urllib.request.Request(url, headers=dict(HEADERS, **extra_headers))
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            return response.status, response.read(), response.headers
+    except urllib.error.HTTPError as e:
+        return e.code, b'', e.headers
+
+def get_json(url, replay=False):
+    return _fetch_json(url, _urlopen, replay)
+
+# One keep-alive connection per (worker thread, host): pages after the first
+# skip the TCP+TLS handshake that urlopen() pays on every call.
+_pool = threading.local()
+
+def _pooled_connection(scheme, netloc, timeout):
+    conns = getattr(_pool, 'conns', None)
+    if conns is None:
+        conns = _pool.conns = {}
+    conn = conns.get((scheme, netloc))
+    if conn is None:
+        cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        conn = conns[(scheme, netloc)] = cls(netloc, timeout=timeout)
+    return conn
+
+def _drop_connection(scheme, netloc):
+    conn = getattr(_pool, 'conns', {}).pop((scheme, netloc), None)
+    if conn is not None:
+        conn.close()
+
+def _pooled_request(url, extra_headers, timeout=20):
+    parts = urllib.parse.urlsplit(url)
+    path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+    headers = dict(HEADERS, **{'Accept-Encoding': 'gzip', 'Connection': 'keep-alive'}, **extra_headers)
+    # A pooled connection may have been closed by the server while idle, so
+    # one reconnect is expected and not treated as a failure.
+    for attempt in range(2):
+        conn = _pooled_connection(parts.scheme, parts.netloc, timeout)
+        try:
+            conn.request('GET', path, headers=headers)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            _drop_connection(parts.scheme, parts.netloc)
+            if attempt:
+                raise
+            continue
+        if resp.will_close:
+            _drop_connection(parts.scheme, parts.netloc)
+        if resp.getheader('Content-Encoding', '') == 'gzip':
+            body = gzip.decompress(body)
+        return resp.status, body, resp.headers
+
+def get_json_pooled(url, timeout=20, replay=False):
+    return _fetch_json(url, lambda u, extra: _pooled_request(u, extra, timeout), replay)
+
+def azure_query_url(base_url=AZURE_PRICES_URL, partition_field=None, partition_value=None, skip=None):
+    flt = AZURE_BASE_FILTER
+    if partition_field:
+        value = partition_value.replace("'", "''")
+        flt += f" and {partition_field} eq '{value}'"
+    query = f"$filter={flt}"
+    if skip:
+        query += f"&$skip={skip}"
+    return f"{base_url}?{urllib.parse.quote(query, safe='=$&')}"
+
+def parse_azure_item(item):
+    sku = item.get("armSkuName", "")
+    service = item.get("serviceName", "").lower()
+    category = "cpu"
+    if "gpu" in service or any(x in sku for x in ["ND", "NC"]): category = "gpu"
+    elif "storage" in service: category = "storage"
+    elif "backup" in service: category = "backup"
+    return {"supplier": "Azure", "region": item.get("armRegionName", "Global"), "instance_type": sku, "category": category, "price": float(item.get("retailPrice", 0.0))}
+
+def _walk_chain(key, url, fetch, checkpoint, max_pages=None):
+    # Pages the checkpoint already counted are replayed from the cache; the
+    # chain then continues from there over the network.
+    done = checkpoint.chain(key)["pages"]
+    pages = 0
+    while url and (max_pages is None or pages < max_pages):
+        data = fetch(url, replay=pages < done)
+        if not data or 'Items' not in data:
+            checkpoint.fail(f"{key} page {pages}")
+            return
+        yield data['Items']
+        pages += 1
         url = data.get('NextPageLink')
-        if not url: break
-    return results
+        if pages > done:
+            checkpoint.advance(key, pages)
+
+def _parse_page(items):
+    with _metrics.phase("classify"):
+        return [parse_azure_item(item) for item in items]
+
+def iter_azure_deep(checkpoint=None, base_url=AZURE_PRICES_URL):
+    checkpoint = checkpoint or CrawlCheckpoint(path=None)
+    for items in _walk_chain("deep", azure_query_url(base_url), get_json, checkpoint, max_pages=30):
+        yield from _parse_page(items)
+
+def fetch_azure_deep():
+    return list(iter_azure_deep())
+
+def _skip_worker(base_url, lock, state, checkpoint, emit, max_pages=None):
+    # Pages are claimed from a shared offset counter; the first short page
+    # marks the end of the catalog and workers stop claiming past it.
+    done, _ = checkpoint.skip_progress()
+    while True:
+        with lock:
+            page = state["next"]
+            if (state["end"] is not None and page > state["end"]) or (max_pages is not None and page >= max_pages):
+                return
+            state["next"] += 1
+        data = get_json_pooled(azure_query_url(base_url, skip=page * AZURE_PAGE_SIZE), replay=page in done)
+        if data is None:
+            checkpoint.fail(f"$skip page {page}")
+            continue
+        items = data.get('Items', [])
+        end = None
+        with lock:
+            if len(items) < AZURE_PAGE_SIZE and (state["end"] is None or page < state["end"]):
+                state["end"] = end = page
+        if page not in done:
+            checkpoint.page_done(page, end)
+        if items:
+            emit(items)
+
+def _partition_worker(base_url, partition_field, todo, checkpoint, emit, max_pages=None):
+    while True:
+        try:
+            value = todo.get_nowait()
+        except queue.Empty:
+            return
+        url = azure_query_url(base_url, partition_field, value)
+        for items in _walk_chain(value, url, get_json_pooled, checkpoint, max_pages):
+            emit(items)
+
+def _stream_pages(work, workers):
+    # Workers hand pages over through a bounded queue, so at most a few pages
+    # per worker are buffered however far ahead the network runs.
+    pages = queue.Queue(maxsize=workers * 2)
+    stop = threading.Event()
+
+    def emit(items):
+        while not stop.is_set():
+            try:
+                pages.put(items, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+    def run():
+        try:
+            work(emit)
+        finally:
+            pages.put(None)
+
+    threads = [threading.Thread(target=run, daemon=True) for _ in range(workers)]
+    for t in threads: t.start()
+    done = 0
+    try:
+        while done < workers:
+            items = pages.get()
+            if items is None:
+                done += 1
+                continue
+            yield items
+    finally:
+        stop.set()
+
+def iter_azure_concurrent(base_url=AZURE_PRICES_URL, partition_field=None, partitions=None, workers=8, max_pages=None, checkpoint=None):
+    """Stream the Azure catalog over pooled keep-alive connections.
+
+    With a partition_field (e.g. serviceName, armRegionName) every value in
+    partitions is walked as its own NextPageLink chain, up to `workers`
+    chains at a time. Without one the catalog is split into $skip offsets.
+    Rows are yielded page by page in completion order.
+    """
+    checkpoint = checkpoint or CrawlCheckpoint(path=None)
+    if partition_field:
+        todo = queue.Queue()
+        for p in partitions:
+            todo.put(p)
+        work = lambda emit: _partition_worker(base_url, partition_field, todo, checkpoint, emit, max_pages)
+    else:
+        lock, state = threading.Lock(), {"next": 0, "end": checkpoint.skip_progress()[1]}
+        work = lambda emit: _skip_worker(base_url, lock, state, checkpoint, emit, max_pages)
+    for items in _stream_pages(work, workers):
+        yield from _parse_page(items)
+
+def fetch_azure_concurrent(base_url=AZURE_PRICES_URL, partition_field=None, partitions=None, workers=8, max_pages=None):
+    return list(iter_azure_concurrent(base_url, partition_field, partitions, workers, max_pages))
 
 def get_all_curated():
     data = []
@@ -71,34 +339,182 @@ def get_all_curated():
             data.append({"supplier": supplier, "region": reg, "instance_type": name, "category": cat, "price": price})
     return data
 
-def main():
-    all_data = []
-    all_data.extend(fetch_azure_deep())
-    all_data.extend(get_all_curated())
-    
-    with open('prices.csv', 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=["supplier", "region", "instance_type", "category", "price"])
-        writer.writeheader()
-        writer.writerows(all_data)
-
-    conn = sqlite3.connect('prices.db')
-    c = conn.cursor()
-    c.execute("DROP TABLE IF EXISTS prices")
-    c.execute("CREATE TABLE prices (supplier TEXT, region TEXT, instance_type TEXT, category TEXT, price REAL)")
-    for d in all_data:
-        c.execute("INSERT INTO prices VALUES (?, ?, ?, ?, ?)", (d['supplier'], d['region'], d['instance_type'], d['category'], d['price']))
-    conn.commit()
-    conn.close()
-
-    with open("prices.hpp", "w") as f:
-        f.write("#pragma once\n#include <vector>\n#include <string>\n\nstruct PriceEntry { std::string supplier, region, instance_type, category; double price_per_hour; };\n")
-        f.write("inline const std::vector<PriceEntry> gpu_prices = {\n")
-        for d in all_data[:1000]:
+@register_provider
+class AzureProvider(PriceProvider):
+    name = "azure"
+    # Full-catalog crawls take minutes and have their own retry budget.
+    timeout = None
+
+    def __init__(self, crawl):
+        self.crawl = crawl
+
+    @classmethod
+    def from_args(cls, args, checkpoint):
+        if args.concurrent:
+            return cls(lambda: iter_azure_concurrent(args.base_url, args.partition_by, args.partitions, args.workers, args.max_pages, checkpoint))
+        return cls(lambda: iter_azure_deep(checkpoint, args.base_url))
+
+    def fetch_prices(self):
+        return self.crawl()
+
+@register_provider
+class CuratedProvider(PriceProvider):
+    name = "curated"
+
+    def fetch_prices(self):
+        return get_all_curated()
+
+@register_provider
+class VastAIProvider(JsonApiProvider):
+    # Same public offers endpoint as VastAIProvider in main.cpp.
+    name = "vastai"
+    url = "https://console.vast.ai/api/v0/bundles/?q=" + urllib.parse.quote('{"verified": {"eq": true}, "external": {"eq": false}, "type": "ask"}')
+
+    def parse(self, data):
+        for offer in data.get("offers", []):
+            yield {"supplier": "Vast.ai", "region": offer.get("geolocation") or "Global",
+                   "instance_type": f"{offer.get('num_gpus', 1)}x {offer.get('gpu_name', 'GPU')}",
+                   "category": "gpu", "price": float(offer.get("dph_total") or 0.0)}
+
+DEFAULT_PROVIDERS = ["azure", "curated"]
+
+PRICE_COLUMNS = ["supplier", "region", "instance_type", "category", "price"]
+CATEGORIES = ["gpu", "cpu", "storage", "backup"]
+
+class CsvSink:
+    def __init__(self, path='prices.csv'):
+        self.f = open(path, 'w', newline='')
+        self.writer = csv.DictWriter(self.f, fieldnames=PRICE_COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class HeaderSink:
+    # prices.hpp is compiled into the C++ tools, so it only carries the first
+    # `limit` entries; prices.bin (SnapshotWriter) holds the full catalog.
+    def __init__(self, path='prices.hpp', limit=1000):
+        self.f = open(path, 'w')
+        self.remaining = limit
+        self.f.write("#pragma once\n#include <vector>\n#include <string>\n\nstruct PriceEntry { std::string supplier, region, instance_type, category; double price_per_hour; };\n")
+        self.f.write("inline const std::vector<PriceEntry> gpu_prices = {\n")
+
+    def write(self, rows):
+        for d in rows[:max(self.remaining, 0)]:
             s, r, i, cat = json.dumps(d['supplier']), json.dumps(d['region']), json.dumps(d['instance_type']), json.dumps(d['category'])
-            f.write(f"    {{{s}, {r}, {i}, {cat}, {d['price']}}},\n")
-        f.write("};\n")
+            self.f.write(f"    {{{s}, {r}, {i}, {cat}, {d['price']}}},\n")
+        self.remaining -= len(rows)
+
+    def close(self):
+        self.f.write("};\n")
+        self.f.close()
+
+def stream_to_sinks(rows, sinks, batch_size=2000, metrics=None):
+    """Fan rows out to every sink in batches of at most batch_size.
+
+    Only one batch is alive at a time, so memory stays flat however large
+    the catalog is. Returns the row count; closing the sinks is left to the
+    caller.
+    """
+    metrics = metrics or _metrics
+    count = 0
+    for batch in iter(lambda: list(itertools.islice(rows, batch_size)), []):
+        for sink in sinks:
+            with metrics.phase(type(sink).__name__):
+                sink.write(batch)
+        count += len(batch)
+        metrics.add_rows(len(batch))
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch cloud prices into prices.csv, prices.db, prices.hpp and prices.bin")
+    parser.add_argument("--concurrent", action="store_true", help="crawl the full Azure catalog with pooled concurrent requests")
+    parser.add_argument("--workers", type=int, default=8, help="max in-flight requests in --concurrent mode")
+    parser.add_argument("--partition-by", choices=["serviceName", "armRegionName"], help="split the crawl by $filter instead of $skip offsets")
+    parser.add_argument("--partitions", default="", help="comma-separated values for --partition-by")
+    parser.add_argument("--max-pages", type=int, help="page cap per partition (default: no cap)")
+    parser.add_argument("--base-url", default=AZURE_PRICES_URL, help="Azure Retail Prices endpoint (point at a local server for tests)")
+    parser.add_argument("--delta", action="store_true", help="only write new or repriced prices.db rows; unchanged rows just get last_seen bumped")
+    parser.add_argument("--categories", default=",".join(CATEGORIES), help="comma-separated categories to keep")
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows per batch handed to the writers")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="on-disk response cache used for conditional requests")
+    parser.add_argument("--no-cache", action="store_true", help="always download every page")
+    parser.add_argument("--offline", action="store_true", help="rebuild the outputs purely from the response cache")
+    parser.add_argument("--rate", type=float, help="max requests per second across all workers")
+    parser.add_argument("--burst", type=float, help="token-bucket burst size for --rate")
+    parser.add_argument("--retries", type=int, default=MAX_RETRIES, help="retries per page for transient failures")
+    parser.add_argument("--resume", action="store_true", help="continue the crawl recorded in the checkpoint file")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH, help="crawl checkpoint file")
+    parser.add_argument("--providers", default=",".join(DEFAULT_PROVIDERS), help=f"comma-separated providers to run concurrently ({', '.join(PROVIDERS)})")
+    parser.add_argument("--provider-timeout", type=float, help="override every provider's time limit in seconds")
+    parser.add_argument("--metrics-json", help="write a JSON summary of page, phase and throughput metrics to this file")
+    parser.add_argument("--progress", type=float, help="print progress to stderr every N seconds")
+    args = parser.parse_args()
+    if args.no_cache and (args.offline or args.resume):
+        parser.error("--offline and --resume need the response cache")
+    cache = None if args.no_cache else ResponseCache(args.cache_dir, offline=args.offline)
+    metrics = FetchMetrics()
+    configure_fetch(cache, args.rate, args.burst, args.retries, metrics)
+    if args.progress:
+        metrics.start_progress(args.progress)
+
+    args.partitions = [p.strip() for p in args.partitions.split(",") if p.strip()]
+    if args.partition_by and not args.partitions:
+        parser.error("--partition-by needs --partitions")
+    names = [n.strip() for n in args.providers.split(",") if n.strip()]
+    unknown = [n for n in names if n not in PROVIDERS]
+    if unknown:
+        parser.error(f"unknown provider(s): {', '.join(unknown)}")
+    config = {"base_url": args.base_url, "concurrent": args.concurrent, "partition_by": args.partition_by,
+              "partitions": args.partitions, "max_pages": args.max_pages}
+    checkpoint = CrawlCheckpoint(config, args.checkpoint, resume=args.resume)
+    providers = [PROVIDERS[n].from_args(args, checkpoint) for n in names]
+    if args.provider_timeout is not None:
+        for p in providers:
+            p.timeout = args.provider_timeout
+    run = ProviderRun(providers)
+    keep = set(args.categories.split(","))
+    rows = (d for d in run if d['category'] in keep)
+
+    # The file outputs are staged next to their targets and only replace
+    # them once the whole catalog came through; prices.db keeps stale rows
+    # instead.
+    outputs = ['prices.csv', 'prices.hpp', 'prices.bin']
+    staged = {path: f"{path}.partial" for path in outputs}
+    db = PriceWriter(delta=args.delta)
+    sinks = [CsvSink(staged['prices.csv']), db, HeaderSink(staged['prices.hpp']), SnapshotWriter(staged['prices.bin'])]
+    count = stream_to_sinks(rows, sinks, args.batch_size, metrics)
+    checkpoint.finish()
+    for sink in sinks:
+        if sink is not db:
+            with metrics.phase(type(sink).__name__):
+                sink.close()
+    complete = checkpoint.complete and not run.failures
+    for path, tmp in staged.items():
+        if complete:
+            os.replace(tmp, path)
+        else:
+            os.remove(tmp)
+    with metrics.phase("PriceWriter"):
+        upserted, stale = db.close(prune=complete)
+    metrics.stop_progress()
+    metrics.providers.update(run.elapsed)
+    if args.metrics_json:
+        metrics.write_json(args.metrics_json)
+    if args.delta:
+        print(f"prices.db: {upserted} rows inserted/updated, {stale} stale rows removed, {db.changes} price changes recorded.")
 
-    print(f"Update Complete. Total entries: {len(all_data)}. All providers included.")
+    if not checkpoint.complete:
+        print(f"Crawl incomplete ({len(checkpoint.failures)} failed: {', '.join(checkpoint.failures[:5])}). "
+              f"Rerun with --resume to continue.", file=sys.stderr)
+    if not complete:
+        print(f"{count} entries fetched; {', '.join(outputs)} left unchanged, stale prices.db rows kept.", file=sys.stderr)
+        sys.exit(1)
+    timings = ", ".join(f"{n} {t:.1f}s" for n, t in run.elapsed.items())
+    print(f"Update Complete. Total entries: {count}. Providers: {timings}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,41 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# Rows of the city x site distance matrix computed at once by coverage_mask
+# (a multiple of 64, so packed coverage blocks start on a word boundary),
+# so a 30k x 5k mask never materialises the full float64 distance matrix.
+CHUNK_ROWS = 4096
+
+def latlon(points, lat='lat', lon='lon'):
+    """(lat, lon) float64 arrays in degrees from a list of dicts."""
+    return (np.array([p[lat] for p in points], dtype=np.float64),
+            np.array([p[lon] for p in points], dtype=np.float64))
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; broadcasts over NumPy arrays."""
+    dlat = np.radians(lat2 - lat1)
+    dlon = np.radians(lon2 - lon1)
+    a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def distance_matrix(a, b=None):
+    """km between every point of `a` (rows) and `b` (columns), each a
+    (lat, lon) pair of arrays. With b=None, the symmetric a x a matrix."""
+    if b is None:
+        b = a
+    return haversine(a[0][:, None], a[1][:, None], b[0][None, :], b[1][None, :])
+
+def iter_coverage(a, b, threshold_km):
+    """(start, mask) blocks of the len(a) x len(b) coverage matrix,
+    CHUNK_ROWS rows of `a` at a time."""
+    for start in range(0, len(a[0]), CHUNK_ROWS):
+        rows = slice(start, start + CHUNK_ROWS)
+        yield start, distance_matrix((a[0][rows], a[1][rows]), b) <= threshold_km
+
+def coverage_mask(a, b, threshold_km):
+    """Boolean len(a) x len(b) matrix: True where the points are within
+    threshold_km of each other."""
+    mask = np.empty((len(a[0]), len(b[0])), dtype=bool)
+    for start, block in iter_coverage(a, b, threshold_km):
+        mask[start:start + len(block)] = block
+    return mask
@@ -0,0 +1,150 @@
+import numpy as np
+from geo import distance_matrix
+
+def sync_mask(points, max_km):
+    """Sites x sites: True where two sites ((lat, lon) arrays) are within
+    max_km of each other and so may sync in the same deployment."""
+    return distance_matrix(points) <= max_km
+
+def _prices(prices):
+    # Free sites are scored as if they cost 0.0001/hr.
+    prices = np.asarray(prices, dtype=np.float64)
+    return np.where(prices > 0, prices, 0.0001)
+
+def gain_weights(counts, population, k):
+    """What one more covering site is worth to each city: (count + 1) *
+    population while the city is below k, nothing once it has k."""
+    counts = np.asarray(counts, dtype=np.int64)
+    return np.where(counts < k, (counts + 1) * np.asarray(population, dtype=np.int64), 0)
+
+def score_sites(coverage, counts, population, prices, k, weight=1.0):
+    """gain * weight / price of every site of `coverage` given the current
+    per-city counts, as one product of the coverage matrix with the gain
+    weights instead of a loop over sites and cities."""
+    return coverage.dot(gain_weights(counts, population, k)) * weight / _prices(prices)
+
+def coverage_with_each(coverage, indices, population, k):
+    """Population covered at least k times by `indices` plus each site of
+    `coverage` in turn, for every site at once."""
+    counts = coverage.counts(indices)
+    population = np.asarray(population, dtype=np.int64)
+    return int(population[counts >= k].sum()) + coverage.dot(np.where(counts == k - 1, population, 0))
+
+class GreedyCoverage:
+    """Greedy k-redundant weighted coverage shared by the scaling solvers.
+
+    Each step adds the site with the highest gain * weight / price, where a
+    site's gain is the sum of (count + 1) * population over the cities it
+    covers that are still below k. Ties go to the lowest index, as in the
+    original per-script loops, and a site may be picked more than once.
+
+    Gains and per-city counts are kept up to date incrementally: adding a
+    site changes only the cities it covers, so only their contribution to
+    the sites covering them is re-added (through the packed words holding
+    those cities) instead of rescoring every site over every city.
+
+    With `sync` (a sync_mask), every pick must be within the sync distance
+    of all earlier ones: `feasible` is narrowed by the new site's row on
+    each add, so no pairwise distances of the selection are recomputed.
+    """
+
+    def __init__(self, coverage, population, prices, k, weight=1.0, sync=None):
+        self.coverage = coverage
+        self.population = np.asarray(population, dtype=np.int64)
+        self.prices = _prices(prices)
+        self.k = k
+        self.weight = weight
+        self.counts = np.zeros(coverage.num_cities, dtype=np.int64)
+        self.selected = []
+        self.sync = sync
+        self.feasible = np.ones(len(coverage.bits), dtype=bool)
+        # Population covered at least k times.
+        self.covered = 0
+        self.gains = coverage.dot(gain_weights(self.counts, self.population, k))
+
+    def scores(self):
+        return np.where(self.feasible, self.gains * self.weight / self.prices, -np.inf)
+
+    def best(self):
+        """Index of the site the next step would add, or -1 if there are none."""
+        return int(np.argmax(self.scores())) if self.feasible.any() else -1
+
+    def add(self, site):
+        cities = self.coverage.cities(site)
+        before = self.counts[cities]
+        self.counts[cities] += 1
+        pop = self.population[cities]
+        # A city below k-1 is now worth one more population to every site
+        # covering it; a city that just reached k is worth nothing.
+        delta = np.where(before + 1 < self.k, pop, -(before + 1) * pop)
+        delta[before >= self.k] = 0
+        self.covered += int(pop[before + 1 == self.k].sum())
+        self.selected.append(site)
+        if self.sync is not None:
+            self.feasible &= self.sync[site]
+        changed = cities[delta != 0]
+        if len(changed):
+            values = np.zeros(self.coverage.num_cities, dtype=np.int64)
+            values[cities] = delta
+            self.gains += self.coverage.dot(values, np.unique(changed // 64))
+
+    def step(self):
+        """Add the best site and return its index (-1 if there is none)."""
+        site = self.best()
+        if site != -1:
+            self.add(site)
+        return site
+
+class VendorCoverage:
+    """Per-city server counts and vendor mix for the multi-vendor rule: a
+    city is covered once k servers from at least min_vendors distinct
+    vendors reach it.
+
+    vendor_counts is cities x vendors, so adding a server touches only the
+    cities it covers, and the "new vendor" bonus for every candidate is one
+    coverage product per vendor rather than a set lookup per city. `sync`
+    and `feasible` work as in GreedyCoverage.
+    """
+
+    def __init__(self, coverage, vendors, population, k, min_vendors, sync=None):
+        self.coverage = coverage
+        self.vendor_names, self.vendor = np.unique(np.asarray(vendors, dtype=str), return_inverse=True)
+        self.population = np.asarray(population, dtype=np.int64)
+        self.k = k
+        self.min_vendors = min_vendors
+        self.counts = np.zeros(coverage.num_cities, dtype=np.int64)
+        self.distinct = np.zeros(coverage.num_cities, dtype=np.int64)
+        self.vendor_counts = np.zeros((coverage.num_cities, len(self.vendor_names)), dtype=np.int32)
+        self.by_vendor = [np.flatnonzero(self.vendor == v) for v in range(len(self.vendor_names))]
+        self.vendor_coverage = [coverage.select(sites) for sites in self.by_vendor]
+        self.selected = []
+        self.sync = sync
+        self.feasible = np.ones(len(coverage.bits), dtype=bool)
+        # Population meeting the rule.
+        self.covered = 0
+
+    def satisfied(self, cities=slice(None)):
+        return (self.counts[cities] >= self.k) & (self.distinct[cities] >= self.min_vendors)
+
+    def add(self, site):
+        cities = self.coverage.cities(site)
+        v = self.vendor[site]
+        was = self.satisfied(cities)
+        self.counts[cities] += 1
+        self.distinct[cities] += self.vendor_counts[cities, v] == 0
+        self.vendor_counts[cities, v] += 1
+        self.covered += int(self.population[cities][self.satisfied(cities) & ~was].sum())
+        self.selected.append(site)
+        if self.sync is not None:
+            self.feasible &= self.sync[site]
+
+    def gains(self, bonus):
+        """Per site: the population it reaches that is still short of
+        servers or vendors, plus `bonus` times the part of that population
+        whose cities have none of the site's vendor yet."""
+        needy = np.where(self.satisfied(), 0, self.population)
+        gains = self.coverage.dot(needy)
+        for v, sites in enumerate(self.by_vendor):
+            fresh = np.where(self.vendor_counts[:, v] == 0, needy, 0)
+            gains[sites] += bonus * self.vendor_coverage[v].dot(fresh)
+        return gains
@@ -0,0 +1,177 @@
+import time
+import numpy as np
+
+def _levels(counts, population, k):
+    """Cities x 4: each city's population in the column of its count, for
+    counts k-2, k-1, k and k+1, and 0 elsewhere."""
+    return np.where(counts[:, None] == np.arange(k - 2, k + 2), population[:, None], 0)
+
+def _sums(coverage, levels, servers, words=None):
+    """Per site of `coverage`, `levels` summed over its cities: columns k-2,
+    k-1 and k over all of them (3 x sites), and columns k-1, k and k+1 over
+    those it shares with each of `servers` (a 3 x sites array per server),
+    all from one coverage product."""
+    values = np.hstack([levels[:, :3]] + [levels[:, 1:] * coverage.column(s)[:, None] for s in servers])
+    out = coverage.dot(values, words).T
+    return out[:3], [out[3 + 3 * i:6 + 3 * i] for i in range(len(servers))]
+
+def improve(coverage, population, prices, selected, k, min_covered=None, sync=None, allowed=None,
+            distinct=True, time_budget=5.0):
+    """Cheaper selection covering at least `min_covered` (default: what
+    `selected` covers) of the population k times, by local search from a
+    greedy start.
+
+    Moves, best first within each kind and applied until a full pass finds
+    none saving more than rounding noise (1e-9 of the current cost) or
+    time_budget seconds pass:
+      drop    remove one server
+      swap    replace one server by a cheaper one
+      swap2   replace two servers by two cheaper in total
+
+    Moves are scored from sums kept up to date as moves are applied: per
+    site, the population it covers at count k-1 (what adding it brings) and
+    at k (what removing it loses), and per selected server and site, the
+    same over the cities the two share. Applying a move changes the counts
+    of only the cities its servers cover, so only their words are summed
+    again, as in GreedyCoverage.add; every drop and swap is then checked by
+    array arithmetic, with no coverage product per candidate. For a 2-swap,
+    every pair of sites that could replace each pair of servers is bounded
+    from the same sums and the survivors are checked exactly, largest saving
+    first. With `sync` (a sync_mask) every server must stay within sync
+    range of the others; `allowed` masks out sites that may not be added;
+    `distinct` keeps a site from being selected twice.
+    """
+    start = time.monotonic()
+    population = np.asarray(population, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    selected = [int(s) for s in selected]
+    counts = coverage.counts(selected)
+    covered = int(population[counts >= k].sum())
+    need = covered if min_covered is None else min_covered
+    start_cost = float(prices[selected].sum())
+    num_sites = len(coverage.bits)
+    allowed = np.ones(num_sites, dtype=bool) if allowed is None else np.asarray(allowed, dtype=bool)
+    cheapest = prices[allowed].min() if allowed.any() else np.inf
+    moves = {"drop": 0, "swap": 0, "swap2": 0}
+
+    # levels[t][j]: population site j covers at count k-2+t; shared[p][t][j]:
+    # the same at count k-1+t over the cities of server p and site j.
+    levels, shared = _sums(coverage, _levels(counts, population, k), selected)
+
+    def addable(out):
+        """Sites allowed in once the servers at positions `out` leave."""
+        ok = allowed.copy()
+        if distinct:
+            ok &= np.bincount(selected, minlength=num_sites) == np.bincount([selected[p] for p in out], minlength=num_sites)
+        if sync is not None:
+            ok &= (~sync[selected]).sum(axis=0) == (~sync[[selected[p] for p in out]]).sum(axis=0)
+        return ok
+
+    def covered_after(out, add):
+        after = counts.copy()
+        for p in out:
+            after -= coverage.column(selected[p])
+        for s in add:
+            after += coverage.column(s)
+        return int(population[after >= k].sum())
+
+    def apply(out, add):
+        nonlocal counts, covered, levels
+        before = _levels(counts, population, k)
+        for p in sorted(out, reverse=True):
+            counts -= coverage.column(selected.pop(p))
+            shared.pop(p)
+        kept = len(selected)
+        for s in add:
+            counts += coverage.column(s)
+            selected.append(s)
+        covered = int(population[counts >= k].sum())
+        after = _levels(counts, population, k)
+        changed = np.flatnonzero((after != before).any(axis=1))
+        if len(changed):
+            delta, deltas = _sums(coverage, after - before, selected[:kept], np.unique(changed // 64))
+            levels += delta
+            for rows, d in zip(shared, deltas):
+                rows += d
+        if add:
+            shared.extend(_sums(coverage, after, add)[1])
+
+    timed_out = False
+    improved = True
+    while improved and selected:
+        improved = False
+        # Savings below this are floating-point noise, not a cheaper set;
+        # accepting them lets equal-cost sets swap back and forth.
+        tol = 1e-9 * float(prices[selected].sum())
+        server_prices = prices[selected]
+        loss = levels[2][selected]
+
+        drops = [p for p in range(len(selected)) if covered - loss[p] >= need and server_prices[p] > tol]
+        if drops:
+            p = max(drops, key=lambda p: (server_prices[p], -p))
+            apply([p], [])
+            moves["drop"] += 1
+            improved = True
+            continue
+
+        # Swapping server p for site j loses p's cities at k and gains j's at
+        # k-1, except where they overlap: there the count stays put.
+        swapped = covered - loss[:, None] + levels[1] + np.array([rows[1] - rows[0] for rows in shared])
+        ok = np.array([addable([p]) for p in range(len(selected))])
+        ok &= (prices < server_prices[:, None] - tol) & (swapped >= need)
+        if ok.any():
+            p, j = np.unravel_index(np.argmax(np.where(ok, server_prices[:, None] - prices, -np.inf)), ok.shape)
+            apply([int(p)], [int(j)])
+            moves["swap"] += 1
+            improved = True
+            continue
+
+        best = None
+        pairs = sorted(((p, q) for p in range(len(selected)) for q in range(p + 1, len(selected))),
+                       key=lambda pq: -(server_prices[pq[0]] + server_prices[pq[1]]))
+        for p, q in pairs:
+            removed = server_prices[p] + server_prices[q]
+            floor = tol if best is None else max(tol, best[0])
+            # Pairs are in decreasing price, so nothing later can save more.
+            if removed - 2 * cheapest <= floor:
+                break
+            if time.monotonic() - start > time_budget:
+                timed_out = True
+                break
+            t = selected[q]
+            # Each of p and q loses its cities at k; a city of both at k is
+            # lost once, not twice, and one of both at k+1 is lost too.
+            left = covered - loss[p] - loss[q] + shared[p][1][t] - shared[p][2][t]
+            lost = covered - left
+            # What a site can bring back: its cities at k-2 or k-1, plus its
+            # share of what p and q lost. Two sites need at least need - left.
+            bound = levels[0] + levels[1] + np.minimum(lost, shared[p][1] + shared[p][2] + shared[q][1] + shared[q][2])
+            ok = addable([p, q]) & (prices < removed - floor)
+            if not ok.any():
+                continue
+            ok &= bound + bound[ok].max() >= need - left
+            cand = np.flatnonzero(ok)
+            saving = removed - prices[cand][:, None] - prices[cand][None, :]
+            fits = (saving > floor) & (bound[cand][:, None] + bound[cand][None, :] >= need - left)
+            fits &= np.triu(np.ones(fits.shape, dtype=bool), 1 if distinct else 0)
+            if sync is not None:
+                fits &= sync[np.ix_(cand, cand)]
+            rows, cols = np.nonzero(fits)
+            for r in np.argsort(-saving[rows, cols], kind='stable'):
+                if time.monotonic() - start > time_budget:
+                    timed_out = True
+                    break
+                i, j = int(cand[rows[r]]), int(cand[cols[r]])
+                if covered_after([p, q], [i, j]) >= need:
+                    best = (float(saving[rows[r], cols[r]]), p, q, i, j)
+                    break
+            if timed_out:
+                break
+        if best is not None:
+            apply([best[1], best[2]], [best[3], best[4]])
+            moves["swap2"] += 1
+            improved = True
+
+    cost = float(prices[selected].sum())
+    return {"sites": selected, "cost": cost, "start_cost": start_cost, "saved": start_cost - cost,
+            "covered": covered, "moves": moves, "timed_out": timed_out}
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import types
+import numpy as np
+from geo import latlon
+from packed_coverage import PackedCoverage
+from spatial_index import NeighborLists
+from price_db import DB_PATH, load_sites, snapshot_id
+
+CACHE_DIR = '.matrix_cache'
+MAX_CACHE_BYTES = 2 << 30
+
+def digest(*arrays):
+    h = hashlib.sha256()
+    for a in arrays:
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.dtype}{a.shape}".encode('utf-8'))
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+def code_digest(fn):
+    # Editing a prepare function (say, an overhead table in a literal)
+    # changes its bytecode or constants and so the key. Nested code objects
+    # are hashed by content; their repr carries a memory address.
+    h = hashlib.sha256()
+
+    def feed(code):
+        h.update(code.co_code)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                feed(const)
+            else:
+                h.update(repr(const).encode('utf-8'))
+
+    feed(fn.__code__)
+    return h.hexdigest()
+
+def cache_key(parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:32]
+
+def _load(path):
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # Zero-length arrays cannot be mapped.
+        return np.load(path)
+
+class MatrixCache:
+    """Content-addressed store of derived solver inputs.
+
+    An entry is a directory of .npy arrays plus meta.json (site lists and
+    other small JSON values), named by the hash of everything it was derived
+    from, so a changed input is simply a different key. Arrays are opened as
+    read-only memory maps. Reading an entry touches it; once the store grows
+    past max_bytes the least recently used entries are deleted.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def get(self, key):
+        path = os.path.join(self.root, key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            arrays = {name: _load(os.path.join(path, name + '.npy')) for name in meta['arrays']}
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return arrays, meta['data']
+
+    def put(self, key, arrays, data=None):
+        path = os.path.join(self.root, key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(tmp)
+        for name, a in arrays.items():
+            np.save(os.path.join(tmp, name + '.npy'), a)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump({"arrays": list(arrays), "data": data}, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # Another process stored the same key first; its entry is identical.
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def cached(self, parts, build):
+        """Arrays and data for the inputs described by `parts`, calling
+        build() -> (arrays, data) and storing the result on a miss."""
+        key = cache_key(parts)
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        arrays, data = build()
+        self.put(key, arrays, data)
+        return self.get(key) or (arrays, data)
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith('.tmp') or not os.path.isdir(path):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+_default = None
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = MatrixCache()
+    return _default
+
+def neighbor_lists(cities, sites, max_km, cache=None):
+    """NeighborLists for `cities` x `sites` ((lat, lon) array pairs), cached
+    by their coordinates so every threshold up to max_km shares one entry."""
+    cache = cache or default_cache()
+    parts = {"kind": "neighbor_lists", "cities": digest(*cities), "sites": digest(*sites), "max_km": max_km}
+    arrays, _ = cache.cached(parts, lambda: (NeighborLists.build(cities, sites, max_km).arrays, None))
+    return NeighborLists(max_km, **arrays)
+
+def packed_coverage(cities, sites, threshold_km, reach_km=None, cache=None):
+    """PackedCoverage of `sites` over `cities` ((lat, lon) array pairs),
+    cached by their coordinates and the threshold. A miss derives it from
+    NeighborLists built out to reach_km (default: the threshold itself, so
+    work grows with the pairs actually covered); a sweep passes its largest
+    threshold so every threshold shares one list."""
+    cache = cache or default_cache()
+    reach_km = max(threshold_km, reach_km or threshold_km)
+    parts = {"kind": "packed_coverage", "cities": digest(*cities), "sites": digest(*sites), "threshold_km": threshold_km}
+
+    def build():
+        lists = neighbor_lists(cities, sites, reach_km, cache)
+        return {"bits": PackedCoverage.from_neighbors(lists, threshold_km).bits}, None
+
+    arrays, _ = cache.cached(parts, build)
+    return PackedCoverage(arrays["bits"], len(cities[0]))
+
+def site_coverage(cities, category, threshold_km, per_region=False, prepare=None, params=None, path=DB_PATH,
+                  reach_km=None, cache=None):
+    """Candidate sites from prices.db and their city x site PackedCoverage.
+
+    prepare(site) -> dict derives each option (adding overheads, risk...);
+    `params` lists any outside values it reads so they become part of the
+    site list's key along with the prices.db snapshot. reach_km is passed
+    on to packed_coverage().
+    """
+    cache = cache or default_cache()
+    parts = {"kind": "sites", "db": snapshot_id(path), "category": category, "per_region": per_region,
+             "prepare": code_digest(prepare) if prepare else None, "params": params}
+
+    def build():
+        sites = load_sites(category, path, per_region)
+        if prepare:
+            sites = [prepare(s) for s in sites]
+        return {}, sites
+
+    _, sites = cache.cached(parts, build)
+    return sites, packed_coverage(cities.points(), latlon(sites), threshold_km, reach_km, cache)
+
+def city_coverage(cities, threshold_km, reach_km=None, cache=None):
+    """city x city PackedCoverage, for solvers that may place a server in any city."""
+    points = cities.points()
+    return packed_coverage(points, points, threshold_km, reach_km, cache)
@@ -1,17 +1,10 @@
-import json
-import math
-import csv
-import numpy as np
+from matrix_cache import city_coverage
+from demand import load_demand
+from greedy import sync_mask
+from solution_path import coverage_path
 
 # 1. Load Data
-cities = []
-with open('cities.csv', mode='r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        row['population'] = int(row['population'])
-        row['latitude'] = float(row['latitude'])
-        row['longitude'] = float(row['longitude'])
-        cities.append(row)
+cities = load_demand()
 
 # Curated Pricing from database
 CHEAP_COMPANY = "TensorDock"
@@ -22,59 +15,29 @@ EXPENSIVE_COMPANY = "AWS"
 EXPENSIVE_TYPE = "p5.48xlarge (8xH100)"
 EXPENSIVE_PRICE = 98.32
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371 
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
-
 SYNC_DIST_KM = 4000.0 # ~20ms
 LATENCY_THRESHOLD_KM = 800.0 # ~5ms
 MIN_SERVERS_FOR_COVERAGE = 3 # 2-fault tolerance
-total_pop = sum(c['population'] for c in cities)
+total_pop = cities.total
 
 num_cities = len(cities)
 # We treat each city as a potential server site
-coverage_matrix = np.zeros((num_cities, num_cities))
-for i in range(num_cities):
-    for j in range(num_cities):
-        if haversine(cities[i]['latitude'], cities[i]['longitude'], 
-                     cities[j]['latitude'], cities[j]['longitude']) <= LATENCY_THRESHOLD_KM:
-            coverage_matrix[i, j] = 1
-
-def get_coverage(indices):
-    if len(indices) < MIN_SERVERS_FOR_COVERAGE: return 0
-    server_counts = np.sum(coverage_matrix[:, indices], axis=1)
-    mask = (server_counts >= MIN_SERVERS_FOR_COVERAGE).astype(int)
-    return np.sum(mask * [c['population'] for c in cities])
+coverage_matrix = city_coverage(cities, LATENCY_THRESHOLD_KM)
+# Cities within sync range of each other
+sync = sync_mask(cities.points(), SYNC_DIST_KM)
 
 print(f"Comparison: {CHEAP_COMPANY} (${CHEAP_PRICE}/hr) vs {EXPENSIVE_COMPANY} (${EXPENSIVE_PRICE}/hr)")
 print(f"Constraints: 20ms sync, 2-fault tolerance (3 servers per city), 5ms user latency\n")
 print(f"{'N':>2} | {'Coverage %':>10} | {'Cheapest ($/hr)':>15} | {'Expensivest ($/hr)':>18} | {'Monthly Diff ($)':>15}")
 print("-" * 75)
 
-selected_indices = []
+# Greedy expansion for coverage, run once for all N; one server is added per step
+path = coverage_path(coverage_matrix, cities.population, MIN_SERVERS_FOR_COVERAGE, 26, sync=sync)
 for n in range(5, 31):
-    # Greedy expansion for coverage
-    best_s = -1
-    best_pop = -1
-    for s in range(num_cities):
-        if s in selected_indices: continue
-        pop = get_coverage(selected_indices + [s])
-        if pop > best_pop:
-            best_pop = pop
-            best_s = s
-    
-    if best_s != -1:
-        selected_indices.append(best_s)
-    else:
-        # Pick largest population city if no improvement
-        rem = [i for i in range(num_cities) if i not in selected_indices]
-        if rem: selected_indices.append(rem[0])
+    step = min(n - 4, len(path))
+    selected_indices = path.prefix(step)
 
-    cov_pct = get_coverage(selected_indices) / total_pop * 100
+    cov_pct = path.covered_at(step) / total_pop * 100
     cost_cheap = n * CHEAP_PRICE
     cost_exp = n * EXPENSIVE_PRICE
     monthly_diff = (cost_exp - cost_cheap) * 24 * 30
@@ -83,4 +46,4 @@ for n in range(5, 31):
 
 print("\nFinal Config (N=30) Locations:")
 for idx in selected_indices:
-    print(f"- {cities[idx]['city']}")
+    print(f"- {cities.names[idx]}")
@@ -0,0 +1,75 @@
+import argparse
+import numpy as np
+from compute_optimizer import VENDOR_RISKS
+from matrix_cache import site_coverage
+from demand import load_demand
+from greedy import GreedyCoverage, VendorCoverage
+from exact import meets, solve_exact
+
+def with_overhead(site):
+    overhead = 1.15
+    if site['supplier'] in ["Vultr", "Linode"]: overhead = 1.20
+    elif site['supplier'] == "TensorDock": overhead = 1.10
+    return {"supplier": site['supplier'], "region": site['region'], "type": site['type'],
+            "real_price": site['price'] * overhead, "risk": VENDOR_RISKS.get(site['supplier'], 0.5),
+            "lat": site['lat'], "lon": site['lon']}
+
+def greedy_placement(cov, opts, population, k, target, min_vendors, allowed, max_n=300):
+    """The greedy solvers' selection, run until it meets the target."""
+    total = int(np.sum(population))
+    prices = np.array([o['real_price'] for o in opts])
+    if min_vendors > 1:
+        state = VendorCoverage(cov, [o['supplier'] for o in opts], population, k, min_vendors)
+        score = lambda: state.gains(50) / prices
+    else:
+        state = GreedyCoverage(cov, population, prices, k)
+        score = state.scores
+    while state.covered < target * total and len(state.selected) < max_n:
+        scores = np.where(allowed, score(), -np.inf)
+        site = int(np.argmax(scores)) if len(scores) else -1
+        if site == -1 or scores[site] <= 0:
+            break
+        state.add(site)
+    return state.selected
+
+parser = argparse.ArgumentParser(description="Minimum-cost k-redundant placement: greedy vs exact integer program")
+parser.add_argument("--category", default="cpu")
+parser.add_argument("--threshold-km", type=float, default=1000.0, help="latency radius a server covers")
+parser.add_argument("--k", type=int, default=3, help="servers required in range of a covered city")
+parser.add_argument("--target", type=float, default=0.9, help="fraction of the population to cover")
+parser.add_argument("--min-vendors", type=int, default=1, help="distinct vendors required per covered city")
+parser.add_argument("--max-risk", type=float, default=1.0, help="skip vendors riskier than this")
+parser.add_argument("--time-limit", type=float, default=60.0, help="seconds for the exact solver")
+parser.add_argument("--gap", type=float, default=1e-4, help="stop once within this relative optimality gap")
+args = parser.parse_args()
+
+cities = load_demand()
+total_pop = cities.total
+opts, cov = site_coverage(cities, args.category, args.threshold_km, prepare=with_overhead, params=VENDOR_RISKS)
+prices = np.array([o['real_price'] for o in opts])
+risks = np.array([o['risk'] for o in opts])
+allowed = risks <= args.max_risk
+
+print(f"MINIMUM-COST PLACEMENT: {args.k}x coverage of {args.target*100:.0f}% of the population, "
+      f"{args.threshold_km:.0f}km, >= {args.min_vendors} vendors, risk <= {args.max_risk}\n")
+
+greedy = greedy_placement(cov, opts, cities.population, args.k, args.target, args.min_vendors, allowed)
+greedy_cost = prices[greedy].sum() if greedy else 0.0
+met = meets(cov, greedy, cities.population, args.k, args.target, [o['supplier'] for o in opts], args.min_vendors)
+print(f"Greedy: N={len(greedy):3} | ${greedy_cost*24*30:10.2f}/mo" + ("" if met else " | target not met"))
+
+result = solve_exact(cov, cities.population, prices, args.k, args.target,
+                     vendors=[o['supplier'] for o in opts], min_vendors=args.min_vendors,
+                     risks=risks, max_risk=args.max_risk, incumbent=greedy,
+                     time_limit=args.time_limit, gap=args.gap)
+if result['sites'] is None:
+    print(f"Exact:  no solution ({result['status']}: {result['message']})")
+else:
+    print(f"Exact:  N={len(result['sites']):3} | ${result['cost']*24*30:10.2f}/mo | {result['status']}")
+    if result['bound'] is not None:
+        print(f"Lower bound: ${result['bound']*24*30:10.2f}/mo | gap {result['gap']*100:.2f}%")
+    if met:
+        print(f"Greedy overspend vs best found: ${(greedy_cost - result['cost'])*24*30:,.2f}/mo")
+    print(f"\n{'Supplier':<15} | {'Region':<15} | {'Type':<25} | {'Count':>5}")
+    for i, n in zip(*np.unique(result['sites'], return_counts=True)):
+        print(f"{opts[i]['supplier']:<15} | {opts[i]['region']:<15} | {opts[i]['type']:<25} | {n:5}")
@@ -0,0 +1,145 @@
+import numpy as np
+from spatial_index import GridIndex
+
+# Sites unpacked at once by PackedCoverage.dot.
+SITE_CHUNK = 256
+
+def _pack(mask):
+    """Pack a cities x sites boolean block into sites x words uint64,
+    city c at bit c % 64 of word c // 64."""
+    rows = mask.shape[0]
+    if rows % 64:
+        mask = np.vstack([mask, np.zeros((64 - rows % 64, mask.shape[1]), dtype=bool)])
+    return np.ascontiguousarray(np.packbits(mask.T, axis=1, bitorder='little')).view('<u8')
+
+def popcount(bits):
+    return int(np.bitwise_count(bits).sum())
+
+class PackedCoverage:
+    """City x site coverage as one bitset over cities per site.
+
+    bits[j] holds site j's covered cities, 64 to a uint64 word: one bit per
+    flag instead of the 8 bytes of a float64 matrix, so 30k cities x 5k sites
+    fits in about 19 MB. Sets of cities (say, those already covered three
+    times) use the same packed layout and combine with the site bitsets by
+    bitwise ops and popcount.
+    """
+
+    def __init__(self, bits, num_cities):
+        self.bits = bits
+        self.num_cities = num_cities
+
+    @classmethod
+    def from_mask(cls, mask):
+        return cls(_pack(np.asarray(mask, dtype=bool)), mask.shape[0])
+
+    @classmethod
+    def from_pairs(cls, pairs, num_cities, num_sites):
+        """Coverage from an iterable of (city index, site index) array pairs."""
+        bits = np.zeros((num_sites, -(-num_cities // 64)), dtype=np.uint64)
+        for city_idx, site_idx in pairs:
+            np.bitwise_or.at(bits, (site_idx, city_idx // 64), np.left_shift(np.uint64(1), (city_idx % 64).astype(np.uint64)))
+        return cls(bits, num_cities)
+
+    @classmethod
+    def build(cls, cities, sites, threshold_km):
+        """Coverage of `sites` over `cities` ((lat, lon) array pairs). A grid
+        index over the sites finds the covered pairs, so neither the full
+        boolean matrix nor every city x site distance is computed."""
+        pairs = GridIndex(sites, threshold_km).iter_pairs(cities)
+        return cls.from_pairs(pairs, len(cities[0]), len(sites[0]))
+
+    @classmethod
+    def from_neighbors(cls, lists, threshold_km):
+        """Coverage at any threshold up to the NeighborLists' max_km."""
+        return cls.from_pairs([lists.pairs(threshold_km)], len(lists.city_ptr) - 1, len(lists.site_ptr) - 1)
+
+    @property
+    def shape(self):
+        return self.num_cities, len(self.bits)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def unpack(self, bitset):
+        """Boolean per-city vector of a packed city set."""
+        return np.unpackbits(np.ascontiguousarray(bitset).view(np.uint8), count=self.num_cities, bitorder='little').view(bool)
+
+    def column(self, site):
+        return self.unpack(self.bits[site])
+
+    def cities(self, site):
+        """Indices of the cities `site` covers, ascending."""
+        return np.flatnonzero(self.column(site))
+
+    def sites(self, city):
+        """Indices of the sites covering `city`, ascending."""
+        word, bit = divmod(city, 64)
+        return np.flatnonzero((self.bits[:, word] >> np.uint64(bit)) & np.uint64(1))
+
+    def dot(self, values, words=None):
+        """Per-site sum of `values` (one per city) over the cities each site
+        covers, as one float64 matrix-vector product per block of sites
+        (exact for integer totals below 2**53). With `words`, only those
+        64-city blocks are looked at, which is all that is needed when
+        `values` is zero elsewhere. `values` may also be cities x n, giving
+        sites x n from a single pass over the bitsets."""
+        values = np.asarray(values)
+        rest = values.shape[1:]
+        padded = np.zeros((self.bits.shape[1] * 64,) + rest, dtype=np.float64)
+        padded[:self.num_cities] = values
+        bits = self.bits
+        if words is not None:
+            bits = bits[:, words]
+            padded = padded.reshape((-1, 64) + rest)[words].reshape((-1,) + rest)
+        out = np.zeros((len(bits),) + rest, dtype=np.float64)
+        for start in range(0, len(bits), SITE_CHUNK):
+            block = np.unpackbits(np.ascontiguousarray(bits[start:start + SITE_CHUNK]).view(np.uint8), axis=1, bitorder='little')
+            out[start:start + len(block)] = block.astype(np.float64) @ padded
+        return out if values.dtype.kind == 'f' else np.rint(out).astype(values.dtype)
+
+    def covers(self, city, site):
+        word, bit = divmod(city, 64)
+        return bool((int(self.bits[site, word]) >> bit) & 1)
+
+    def select(self, sites):
+        """Coverage restricted to the given sites, in that order."""
+        return PackedCoverage(self.bits[list(sites)], self.num_cities)
+
+    def counts(self, sites):
+        """How many of `sites` cover each city; a site listed twice counts twice."""
+        counts = np.zeros(self.num_cities, dtype=np.int64)
+        for site, times in zip(*np.unique(np.asarray(sites, dtype=np.int64), return_counts=True)):
+            counts += self.column(site) * times
+        return counts
+
+    def at_least(self, sites, k):
+        """Packed set of cities covered by at least k of `sites`.
+
+        Row t of `reached` is the set of cities covered t or more times so
+        far; adding a site promotes every row at once with one AND and one
+        OR over whole words, so no per-city counts are materialised.
+        """
+        if k <= 0:
+            return self.everyone()
+        reached = np.zeros((k + 1, self.bits.shape[1]), dtype=np.uint64)
+        reached[0] = self.everyone()
+        for site in sites:
+            reached[1:] |= reached[:-1] & self.bits[site]
+        return reached[k]
+
+    def everyone(self):
+        """Packed set of all cities."""
+        bits = np.full(self.bits.shape[1], np.uint64(0xFFFFFFFFFFFFFFFF))
+        if self.num_cities % 64:
+            bits[-1] = np.uint64((1 << (self.num_cities % 64)) - 1)
+        return bits
+
+    def population(self, bitset, weights):
+        """Total weight (population) of the cities in a packed set."""
+        return np.asarray(weights)[self.unpack(bitset)].sum()
+
+    def to_mask(self):
+        return np.stack([self.column(j) for j in range(len(self.bits))], axis=1) if len(self.bits) \
+            else np.zeros((self.num_cities, 0), dtype=bool)
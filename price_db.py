@@ -0,0 +1,355 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+DB_PATH = 'prices.db'
+
+# Data center coordinates for every region name the solvers place servers in.
+# Names are matched exactly first, then lower-cased.
+REGION_COORDS = {
+    # Azure
+    "eastus": (37.37, -78.78), "eastus2": (36.66, -78.38), "westus": (37.77, -122.41),
+    "westus2": (47.23, -119.85), "westus3": (33.44, -112.07), "centralus": (41.59, -93.60),
+    "southcentralus": (29.41, -98.50), "northcentralus": (41.88, -87.62), "westcentralus": (41.59, -107.21),
+    "usgovvirginia": (37.54, -77.43), "usgovtexas": (30.26, -97.74), "usgovarizona": (33.44, -112.07),
+    "usgoviowa": (41.59, -93.60), "southwestus": (33.44, -112.07),
+    "canadacentral": (43.65, -79.38), "canadaeast": (46.81, -71.21),
+    "brazilsouth": (-23.55, -46.63), "southindia": (12.97, 77.59), "indonesiacentral": (-1.26, 116.82),
+    # AWS/GCP/OCI
+    "us-east-1": (38.99, -77.45), "us-east-2": (40.09, -82.75),
+    "us-west-1": (37.44, -122.15), "us-west-2": (45.92, -119.27),
+    "us-central1": (41.26, -95.93), "us-ashburn-1": (39.04, -77.48),
+    "us-south": (29.76, -95.36), "NJ": (40.71, -74.00), "NY": (40.71, -74.00),
+    "nyc3": (40.71, -74.00), "US-East": (40.00, -75.00), "US-West": (37.00, -120.00),
+    "attdallas1": (32.77, -96.79), "attdetroit1": (42.33, -83.04),
+    "attatlanta1": (33.74, -84.38), "attnewyork1": (40.71, -74.00),
+    # VPS & Budget
+    "portland": (45.51, -122.67), "nj": (40.71, -74.00), "lv": (36.17, -115.13),
+    "ash": (39.04, -77.48), "kc": (39.10, -94.58), "nc": (35.76, -78.64),
+    "losangeles": (34.05, -118.24), "ashburn": (39.04, -77.48), "dallas": (32.77, -96.79),
+    "lasvegas": (36.17, -115.13), "us-east": (40.71, -74.00), "us-central": (41.87, -87.62),
+    "atlanta": (33.74, -84.38),
+}
+
+# Zero-priced meters (free tiers, billing artifacts) are not rentable servers.
+MIN_SITE_PRICE = 0.0001
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suppliers (
+    id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL);
+CREATE TABLE IF NOT EXISTS regions (
+    id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL, lat REAL, lon REAL);
+CREATE TABLE IF NOT EXISTS instances (
+    supplier_id INTEGER NOT NULL REFERENCES suppliers(id),
+    region_id INTEGER NOT NULL REFERENCES regions(id),
+    instance_type TEXT NOT NULL, category TEXT NOT NULL, price REAL, first_seen TEXT, last_seen TEXT,
+    PRIMARY KEY (supplier_id, region_id, instance_type, category));
+CREATE INDEX IF NOT EXISTS idx_instances_category_price ON instances(category, price);
+CREATE INDEX IF NOT EXISTS idx_instances_region ON instances(region_id, category, price);
+CREATE INDEX IF NOT EXISTS idx_instances_last_seen ON instances(last_seen);
+CREATE VIEW IF NOT EXISTS prices AS
+    SELECT s.name AS supplier, r.name AS region, i.instance_type, i.category, i.price, i.first_seen, i.last_seen
+    FROM instances i JOIN suppliers s ON s.id = i.supplier_id JOIN regions r ON r.id = i.region_id;
+CREATE TABLE IF NOT EXISTS cheapest_site (
+    category TEXT NOT NULL, supplier TEXT NOT NULL, region TEXT NOT NULL,
+    instance_type TEXT, price REAL, lat REAL, lon REAL,
+    PRIMARY KEY (category, supplier, region)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cheapest_site_price ON cheapest_site(category, price);
+CREATE TABLE IF NOT EXISTS price_history (
+    supplier_id INTEGER NOT NULL, region_id INTEGER NOT NULL, instance_type TEXT NOT NULL,
+    category TEXT NOT NULL, changed_at TEXT NOT NULL, price REAL,
+    PRIMARY KEY (supplier_id, region_id, instance_type, category, changed_at)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_history_changed_at ON price_history(changed_at);
+CREATE TABLE IF NOT EXISTS snapshots (
+    taken_at TEXT PRIMARY KEY, entries INTEGER, changes INTEGER, complete INTEGER);
+"""
+
+# Rows are keyed on (supplier, region, instance_type, category): Azure meters
+# of different services can share an instance_type (often an empty
+# armSkuName), so the category keeps them apart. Azure also lists several
+# meters per SKU (OS, spot, low priority); within one refresh the cheapest
+# wins, while a row carried over from an earlier refresh takes the new price.
+UPSERT_SQL = """
+INSERT INTO instances (supplier_id, region_id, instance_type, category, price, first_seen, last_seen)
+VALUES ((SELECT id FROM suppliers WHERE name = ?), (SELECT id FROM regions WHERE name = ?), ?, ?, ?, ?, ?)
+ON CONFLICT(supplier_id, region_id, instance_type, category) DO UPDATE SET
+    price = CASE WHEN instances.last_seen = excluded.last_seen THEN MIN(instances.price, excluded.price) ELSE excluded.price END,
+    last_seen = excluded.last_seen
+WHERE instances.last_seen < excluded.last_seen OR excluded.price < instances.price
+"""
+
+# A delta refresh first collects the cheapest price per key in temp.seen and
+# only writes instances that are new or repriced; the rest of the seen rows
+# get last_seen bumped in one statement.
+SEEN_SQL = """
+INSERT INTO temp.seen (supplier_id, region_id, instance_type, category, price)
+VALUES ((SELECT id FROM suppliers WHERE name = ?), (SELECT id FROM regions WHERE name = ?), ?, ?, ?)
+ON CONFLICT(supplier_id, region_id, instance_type, category) DO UPDATE SET price = MIN(seen.price, excluded.price)
+"""
+
+MERGE_SEEN_SQL = """
+INSERT INTO instances (supplier_id, region_id, instance_type, category, price, first_seen, last_seen)
+SELECT supplier_id, region_id, instance_type, category, price, ?1, ?1 FROM temp.seen WHERE true
+ON CONFLICT(supplier_id, region_id, instance_type, category) DO UPDATE SET
+    price = excluded.price, last_seen = excluded.last_seen
+WHERE excluded.price IS NOT instances.price
+"""
+
+TOUCH_SEEN_SQL = """
+UPDATE instances SET last_seen = ?1
+WHERE last_seen < ?1 AND EXISTS (
+    SELECT 1 FROM temp.seen t
+    WHERE t.supplier_id = instances.supplier_id AND t.region_id = instances.region_id
+      AND t.instance_type = instances.instance_type AND t.category = instances.category)
+"""
+
+CHEAPEST_SITE_SQL = """
+INSERT INTO cheapest_site (category, supplier, region, instance_type, price, lat, lon)
+SELECT i.category, s.name, r.name, i.instance_type, MIN(i.price), r.lat, r.lon
+FROM instances i JOIN suppliers s ON s.id = i.supplier_id JOIN regions r ON r.id = i.region_id
+WHERE r.lat IS NOT NULL AND i.price >= ?
+GROUP BY i.category, i.supplier_id, i.region_id
+"""
+
+# price_history only stores changes: a row per instance whenever its price
+# differs from the previous snapshot, with price NULL once it is delisted.
+# Unchanged prices cost nothing however many snapshots are taken.
+LATEST_HISTORY_SQL = """
+INSERT INTO temp.latest_price
+SELECT supplier_id, region_id, instance_type, category, price FROM (
+    SELECT supplier_id, region_id, instance_type, category, price, MAX(changed_at)
+    FROM price_history GROUP BY supplier_id, region_id, instance_type, category)
+"""
+
+CHANGED_PRICES_SQL = """
+INSERT INTO price_history (supplier_id, region_id, instance_type, category, changed_at, price)
+SELECT i.supplier_id, i.region_id, i.instance_type, i.category, ?, i.price
+FROM instances i LEFT JOIN temp.latest_price l
+    ON l.supplier_id = i.supplier_id AND l.region_id = i.region_id AND l.instance_type = i.instance_type
+    AND l.category = i.category
+WHERE l.price IS NOT i.price
+"""
+
+DELISTED_PRICES_SQL = """
+INSERT INTO price_history (supplier_id, region_id, instance_type, category, changed_at, price)
+SELECT l.supplier_id, l.region_id, l.instance_type, l.category, ?, NULL
+FROM temp.latest_price l
+WHERE l.price IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM instances i
+    WHERE i.supplier_id = l.supplier_id AND i.region_id = l.region_id AND i.instance_type = l.instance_type
+      AND i.category = l.category)
+"""
+
+def region_coords(name):
+    return REGION_COORDS.get(name) or REGION_COORDS.get(name.lower()) or (None, None)
+
+def connect(path=DB_PATH):
+    conn = sqlite3.connect(path)
+    # WAL lets the solvers keep reading the last committed snapshot while a
+    # refresh is writing.
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def _add_category_key(conn):
+    # instances and price_history were keyed without the category; both are
+    # rebuilt once, old history rows taking their instance's category.
+    conn.executescript("""
+        DROP VIEW IF EXISTS prices;
+        DROP INDEX IF EXISTS idx_instances_category_price;
+        DROP INDEX IF EXISTS idx_instances_region;
+        DROP INDEX IF EXISTS idx_instances_last_seen;
+        DROP INDEX IF EXISTS idx_price_history_changed_at;
+        ALTER TABLE instances RENAME TO old_instances;
+        CREATE TABLE IF NOT EXISTS price_history (
+            supplier_id INTEGER, region_id INTEGER, instance_type TEXT, changed_at TEXT, price REAL);
+        ALTER TABLE price_history RENAME TO old_price_history;
+    """ + SCHEMA + """
+        INSERT INTO instances (supplier_id, region_id, instance_type, category, price, first_seen, last_seen)
+        SELECT supplier_id, region_id, instance_type, COALESCE(category, ''), price, first_seen, last_seen
+        FROM old_instances;
+        INSERT OR IGNORE INTO price_history (supplier_id, region_id, instance_type, category, changed_at, price)
+        SELECT h.supplier_id, h.region_id, h.instance_type, COALESCE(i.category, ''), h.changed_at, h.price
+        FROM old_price_history h LEFT JOIN old_instances i
+            ON i.supplier_id = h.supplier_id AND i.region_id = h.region_id AND i.instance_type = h.instance_type;
+        DROP TABLE old_instances;
+        DROP TABLE old_price_history;
+    """)
+
+def init_schema(conn):
+    kind = conn.execute("SELECT type FROM sqlite_master WHERE name = 'prices'").fetchone()
+    if kind and kind[0] == 'table':
+        # Flat pre-normalization layout; it is rebuilt once.
+        conn.execute("DROP TABLE prices")
+    key = [r[1] for r in conn.execute("PRAGMA table_info(instances)") if r[5]]
+    if key and "category" not in key:
+        _add_category_key(conn)
+    conn.executescript(SCHEMA)
+
+def _add_names(conn, batch):
+    conn.executemany("INSERT OR IGNORE INTO suppliers (name) VALUES (?)", {(b[0],) for b in batch})
+    regions = {b[1] for b in batch}
+    conn.executemany("INSERT OR IGNORE INTO regions (name, lat, lon) VALUES (?, ?, ?)", [(r, *region_coords(r)) for r in regions])
+
+def _upsert_batch(conn, batch):
+    _add_names(conn, batch)
+    return conn.executemany(UPSERT_SQL, batch).rowcount
+
+def refresh_cheapest_sites(conn):
+    conn.execute("DELETE FROM cheapest_site")
+    conn.execute(CHEAPEST_SITE_SQL, (MIN_SITE_PRICE,))
+
+class PriceWriter:
+    """Batch sink for prices.db; rebuilds cheapest_site on close().
+
+    A full refresh upserts every row it sees. A delta refresh collects the
+    rows in a temp table and on close() only writes the instances that are
+    new or repriced, bumping last_seen on the rest in one statement. Either
+    way unseen rows are then deleted in the same transaction, so readers
+    never find the table empty.
+    """
+
+    def __init__(self, path=DB_PATH, delta=False):
+        self.now = datetime.now(timezone.utc).isoformat(timespec='microseconds')
+        self.delta = delta
+        self.upserted = 0
+        self.changes = 0
+        self.conn = connect(path)
+        init_schema(self.conn)
+        if delta:
+            self.conn.execute("""CREATE TEMP TABLE seen (
+                supplier_id INTEGER, region_id INTEGER, instance_type TEXT, category TEXT, price REAL,
+                PRIMARY KEY (supplier_id, region_id, instance_type, category))""")
+
+    def write(self, rows):
+        if self.delta:
+            batch = [(d['supplier'], d['region'], d['instance_type'], d['category'], d['price']) for d in rows]
+            _add_names(self.conn, batch)
+            self.conn.executemany(SEEN_SQL, batch)
+            return
+        batch = [(d['supplier'], d['region'], d['instance_type'], d['category'], d['price'], self.now, self.now) for d in rows]
+        self.upserted += _upsert_batch(self.conn, batch)
+
+    def close(self, prune=True):
+        # prune=False keeps rows this refresh did not see, e.g. after a crawl
+        # that stopped early.
+        with self.conn:
+            stale = 0
+            if self.delta:
+                self.upserted = self.conn.execute(MERGE_SEEN_SQL, (self.now,)).rowcount
+                self.conn.execute(TOUCH_SEEN_SQL, (self.now,))
+            if prune:
+                stale = self.conn.execute("DELETE FROM instances WHERE last_seen < ?", (self.now,)).rowcount
+            # Rows this refresh did not see only count as delisted once
+            # they have actually been pruned.
+            self.changes = record_history(self.conn, self.now, delisted=prune)
+            refresh_cheapest_sites(self.conn)
+        self.conn.close()
+        return self.upserted, stale
+
+def record_history(conn, now, delisted=True):
+    """Append the changes since the previous snapshot to price_history."""
+    conn.execute("""CREATE TEMP TABLE IF NOT EXISTS latest_price (
+        supplier_id INTEGER, region_id INTEGER, instance_type TEXT, category TEXT, price REAL,
+        PRIMARY KEY (supplier_id, region_id, instance_type, category))""")
+    conn.execute("DELETE FROM temp.latest_price")
+    conn.execute(LATEST_HISTORY_SQL)
+    changes = conn.execute(CHANGED_PRICES_SQL, (now,)).rowcount
+    if delisted:
+        changes += conn.execute(DELISTED_PRICES_SQL, (now,)).rowcount
+    entries = conn.execute("SELECT COUNT(*) FROM instances").fetchone()[0]
+    conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)", (now, entries, changes, int(delisted)))
+    return changes
+
+def write_sqlite(rows, path=DB_PATH, delta=False, batch_size=5000):
+    writer = PriceWriter(path, delta)
+    batch = []
+    for d in rows:
+        batch.append(d)
+        if len(batch) >= batch_size:
+            writer.write(batch)
+            batch = []
+    if batch:
+        writer.write(batch)
+    return writer.close()
+
+def load_sites(category, path=DB_PATH, per_region=False):
+    """Candidate sites for one category: the cheapest instance per
+    (supplier, region), or per region across all suppliers."""
+    conn = sqlite3.connect(path)
+    if per_region:
+        rows = conn.execute(
+            "SELECT supplier, region, instance_type, MIN(price), lat, lon FROM cheapest_site "
+            "WHERE category = ? GROUP BY region ORDER BY region", (category,)).fetchall()
+    else:
+        rows = conn.execute(
+            "SELECT supplier, region, instance_type, price, lat, lon FROM cheapest_site "
+            "WHERE category = ? ORDER BY supplier, region", (category,)).fetchall()
+    conn.close()
+    return [{"supplier": s, "region": r, "type": i, "price": p, "lat": lat, "lon": lon} for s, r, i, p, lat, lon in rows]
+
+def snapshot_id(path=DB_PATH):
+    """Identifies the catalog in prices.db: the time of the last refresh,
+    or the file's size and mtime for a database that predates snapshots."""
+    conn = sqlite3.connect(path)
+    try:
+        taken_at = conn.execute("SELECT MAX(taken_at) FROM snapshots").fetchone()[0]
+    except sqlite3.OperationalError:
+        taken_at = None
+    conn.close()
+    if taken_at is None:
+        st = os.stat(path)
+        return f"{st.st_size}:{st.st_mtime_ns}"
+    return taken_at
+
+def _timestamp(value):
+    return value.isoformat(timespec='microseconds') if isinstance(value, datetime) else value
+
+def price_history(supplier, region, instance_type, since=None, until=None, path=DB_PATH, category=None):
+    """(changed_at, price) steps for one instance between since and until
+    (datetimes or ISO strings). The first step is the price already in
+    effect at `since`; a None price means the instance was not listed.
+    `category` is only needed when the instance_type is listed under
+    several categories."""
+    conn = sqlite3.connect(path)
+    key = conn.execute(
+        "SELECT s.id, r.id FROM suppliers s, regions r WHERE s.name = ? AND r.name = ?", (supplier, region)).fetchone()
+    if key is None:
+        conn.close()
+        return []
+    if category is None:
+        categories = [c for c, in conn.execute(
+            "SELECT DISTINCT category FROM price_history WHERE supplier_id = ? AND region_id = ? AND instance_type = ?",
+            (*key, instance_type))]
+        if len(categories) > 1:
+            conn.close()
+            raise ValueError(f"{instance_type!r} is listed under several categories; pass one of {sorted(categories)}")
+        category = categories[0] if categories else ''
+    key = (*key, instance_type, category)
+    steps = []
+    if since is not None:
+        steps += conn.execute(
+            "SELECT changed_at, price FROM price_history WHERE supplier_id = ? AND region_id = ? AND instance_type = ? "
+            "AND category = ? AND changed_at <= ? ORDER BY changed_at DESC LIMIT 1", (*key, _timestamp(since))).fetchall()
+    steps += conn.execute(
+        "SELECT changed_at, price FROM price_history WHERE supplier_id = ? AND region_id = ? AND instance_type = ? "
+        "AND category = ? AND changed_at > ? AND changed_at <= ? ORDER BY changed_at",
+        (*key, _timestamp(since) or '', _timestamp(until) or '9999')).fetchall()
+    conn.close()
+    return steps
+
+def price_changes(since, until=None, path=DB_PATH):
+    """Every price change recorded in (since, until], oldest first, with the
+    price it replaced (None for a newly listed instance)."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute("""
+        SELECT s.name, r.name, h.instance_type, h.category, h.changed_at, h.price,
+            (SELECT p.price FROM price_history p
+             WHERE p.supplier_id = h.supplier_id AND p.region_id = h.region_id
+               AND p.instance_type = h.instance_type AND p.category = h.category AND p.changed_at < h.changed_at
+             ORDER BY p.changed_at DESC LIMIT 1)
+        FROM price_history h JOIN suppliers s ON s.id = h.supplier_id JOIN regions r ON r.id = h.region_id
+        WHERE h.changed_at > ? AND h.changed_at <= ?
+        ORDER BY h.changed_at""", (_timestamp(since), _timestamp(until) or '9999')).fetchall()
+    conn.close()
+    return [{"supplier": s, "region": r, "instance_type": i, "category": c, "changed_at": t, "price": p, "previous": prev}
+            for s, r, i, c, t, p, prev in rows]
@@ -0,0 +1,52 @@
+#pragma once
+// Loader for prices.bin, the columnar snapshot written by price_snapshot.py.
+#include <array>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
+#include <span>
+#include <stdexcept>
+#include <string>
+#include <string_view>
+#include <vector>
+
+struct PriceSnapshot {
+    enum Column { Supplier = 0, Region = 1, InstanceType = 2, Category = 3 };
+
+    std::vector<char> data;
+    std::span<const double> price;
+    std::array<std::span<const uint32_t>, 4> codes;
+    std::array<std::vector<std::string_view>, 4> values;
+
+    size_t size() const { return price.size(); }
+    std::string_view get(Column col, size_t row) const { return values[col][codes[col][row]]; }
+};
+
+inline PriceSnapshot load_price_snapshot(const std::string& path = "prices.bin") {
+    PriceSnapshot snap;
+    std::ifstream in(path, std::ios::binary | std::ios::ate);
+    if (!in) throw std::runtime_error("cannot open " + path);
+    snap.data.resize(static_cast<size_t>(in.tellg()));
+    in.seekg(0);
+    in.read(snap.data.data(), static_cast<std::streamsize>(snap.data.size()));
+    if (snap.data.size() < 88 || std::memcmp(snap.data.data(), "GPUPRC01", 8) != 0)
+        throw std::runtime_error(path + " is not a price snapshot");
+
+    uint64_t header[10];
+    std::memcpy(header, snap.data.data() + 8, sizeof(header));
+    const uint64_t n = header[0];
+    const char* base = snap.data.data();
+    snap.price = {reinterpret_cast<const double*>(base + header[1]), n};
+    for (int col = 0; col < 4; ++col) {
+        snap.codes[col] = {reinterpret_cast<const uint32_t*>(base + header[2 + col]), n};
+        const char* dict = base + header[6 + col];
+        uint64_t count;
+        std::memcpy(&count, dict, sizeof(count));
+        const uint64_t* offsets = reinterpret_cast<const uint64_t*>(dict + 8);
+        const char* blob = dict + 8 * (count + 2);
+        snap.values[col].reserve(count);
+        for (uint64_t i = 0; i < count; ++i)
+            snap.values[col].emplace_back(blob + offsets[i], offsets[i + 1] - offsets[i]);
+    }
+    return snap;
+}
@@ -0,0 +1,115 @@
+import array
+import os
+import shutil
+import struct
+import tempfile
+
+SNAPSHOT_PATH = 'prices.bin'
+
+# Layout (little-endian, every section 8-byte aligned):
+#   header   magic[8], u64 n_rows, u64 price_off,
+#            u64 code_off[4], u64 dict_off[4]        (padded to 128 bytes)
+#   prices   f64[n_rows]
+#   codes    u32[n_rows] per column, in COLUMNS order
+#   dicts    per column: u64 count, u64 str_off[count + 1], utf-8 blob
+# str_off is relative to the start of the blob. price_snapshot.hpp reads
+# the same layout on the C++ side.
+MAGIC = b'GPUPRC01'
+COLUMNS = ["supplier", "region", "instance_type", "category"]
+HEADER = struct.Struct('<8sQQ4Q4Q')
+HEADER_SIZE = 128
+
+def _pad(f):
+    f.write(b'\0' * (-f.tell() % 8))
+
+class SnapshotWriter:
+    """Sink that dictionary-encodes rows and writes prices.bin on close().
+
+    Prices and codes are appended to one temporary spill file per column as
+    batches arrive and concatenated into the snapshot on close(), so only
+    the distinct strings of each column stay in memory.
+    """
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        spill_dir = os.path.dirname(os.path.abspath(path))
+        self.n = 0
+        self.prices = tempfile.TemporaryFile(dir=spill_dir)
+        self.codes = [tempfile.TemporaryFile(dir=spill_dir) for _ in COLUMNS]
+        self.dicts = [{} for _ in COLUMNS]
+
+    def write(self, rows):
+        for col, f, lookup in zip(COLUMNS, self.codes, self.dicts):
+            array.array('I', [lookup.setdefault(d[col], len(lookup)) for d in rows]).tofile(f)
+        array.array('d', [d['price'] for d in rows]).tofile(self.prices)
+        self.n += len(rows)
+
+    def close(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * HEADER_SIZE)
+            price_off = f.tell()
+            self.prices.seek(0)
+            shutil.copyfileobj(self.prices, f)
+            code_off = []
+            for codes in self.codes:
+                _pad(f)
+                code_off.append(f.tell())
+                codes.seek(0)
+                shutil.copyfileobj(codes, f)
+            dict_off = []
+            for lookup in self.dicts:
+                _pad(f)
+                dict_off.append(f.tell())
+                blobs = [s.encode('utf-8') for s in lookup]
+                offsets = array.array('Q', [0])
+                for b in blobs:
+                    offsets.append(offsets[-1] + len(b))
+                f.write(struct.pack('<Q', len(blobs)))
+                f.write(offsets.tobytes())
+                f.write(b''.join(blobs))
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, self.n, price_off, *code_off, *dict_off))
+        for spill in (self.prices, *self.codes):
+            spill.close()
+        return self.n
+
+class PriceSnapshot:
+    """Read-only view of prices.bin. Columns are NumPy memory maps, so
+    opening the snapshot costs the same for 1k or 1M rows."""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        import numpy as np
+        raw = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, n, price_off, *offs = HEADER.unpack(raw[:HEADER.size].tobytes())
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a price snapshot")
+        self.n_rows = n
+        self.price = np.frombuffer(raw, dtype='<f8', count=n, offset=price_off)
+        self.codes = {}
+        self.values = {}
+        self.lookup = {}
+        for col, code_off, dict_off in zip(COLUMNS, offs[:len(COLUMNS)], offs[len(COLUMNS):]):
+            self.codes[col] = np.frombuffer(raw, dtype='<u4', count=n, offset=code_off)
+            count = int(np.frombuffer(raw, dtype='<u8', count=1, offset=dict_off)[0])
+            str_off = np.frombuffer(raw, dtype='<u8', count=count + 1, offset=dict_off + 8)
+            blob_off = dict_off + 8 * (count + 2)
+            blob = raw[blob_off:blob_off + int(str_off[-1])].tobytes()
+            self.values[col] = [blob[str_off[i]:str_off[i + 1]].decode('utf-8') for i in range(count)]
+            self.lookup[col] = {value: i for i, value in enumerate(self.values[col])}
+
+    def __len__(self):
+        return self.n_rows
+
+    def code(self, col, value):
+        try:
+            return self.lookup[col][value]
+        except KeyError:
+            raise ValueError(f"{value!r} is not a {col} in the snapshot") from None
+
+    def row(self, i):
+        d = {col: self.values[col][self.codes[col][i]] for col in COLUMNS}
+        d['price'] = float(self.price[i])
+        return d
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    return PriceSnapshot(path)
@@ -0,0 +1,118 @@
+import itertools
+import queue
+import sys
+import threading
+import time
+
+# name -> PriceProvider subclass; filled by @register_provider.
+PROVIDERS = {}
+
+def register_provider(cls):
+    PROVIDERS[cls.name] = cls
+    return cls
+
+class PriceProvider:
+    """One price source. Mirrors PriceProvider in main.cpp: subclasses set
+    `name` and implement fetch_prices(), which yields row dicts with the
+    PRICE_COLUMNS keys. `timeout` (seconds, None for no limit) bounds how
+    long the provider may run."""
+    name = None
+    timeout = 60.0
+
+    @classmethod
+    def from_args(cls, args, checkpoint):
+        return cls()
+
+    def fetch_prices(self):
+        raise NotImplementedError
+
+class JsonApiProvider(PriceProvider):
+    """Provider backed by one JSON endpoint: set `url` and implement
+    parse(data) to turn the decoded response into rows."""
+    url = None
+
+    def __init__(self, get_json):
+        self.get_json = get_json
+
+    @classmethod
+    def from_args(cls, args, checkpoint):
+        from fetch_prices import get_json
+        return cls(get_json)
+
+    def fetch_prices(self):
+        data = self.get_json(self.url)
+        if data is None:
+            raise RuntimeError(f"no response from {self.url}")
+        return self.parse(data)
+
+    def parse(self, data):
+        raise NotImplementedError
+
+class ProviderRun:
+    """Run providers concurrently and iterate over their rows as they arrive.
+
+    Each provider gets its own thread and deadline. A provider that raises or
+    runs out of time is recorded in `failures` (name -> reason) and the rest
+    carry on; rows it produced before failing have already been yielded.
+    """
+
+    def __init__(self, providers, batch_size=500):
+        self.providers = providers
+        self.batch_size = batch_size
+        self.failures = {}
+        self.elapsed = {}
+
+    def _run(self, provider, out, cancelled):
+        start = time.monotonic()
+        error = None
+        try:
+            rows = iter(provider.fetch_prices())
+            for batch in iter(lambda: list(itertools.islice(rows, self.batch_size)), []):
+                while not cancelled.is_set():
+                    try:
+                        out.put((provider.name, batch), timeout=0.5)
+                        break
+                    except queue.Full:
+                        pass
+                if cancelled.is_set():
+                    return
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            self.elapsed[provider.name] = time.monotonic() - start
+            out.put((provider.name, error))
+
+    def __iter__(self):
+        out = queue.Queue(maxsize=4 * max(1, len(self.providers)))
+        cancelled = {p.name: threading.Event() for p in self.providers}
+        start = time.monotonic()
+        deadlines = {p.name: start + p.timeout for p in self.providers if p.timeout is not None}
+        running = {p.name for p in self.providers}
+        for p in self.providers:
+            threading.Thread(target=self._run, args=(p, out, cancelled[p.name]), daemon=True).start()
+        try:
+            while running:
+                pending = [deadlines[n] for n in running if n in deadlines]
+                wait = max(0.0, min(pending) - time.monotonic()) if pending else None
+                try:
+                    name, payload = out.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    for n in [n for n in running if deadlines.get(n, now + 1) <= now]:
+                        cancelled[n].set()
+                        running.discard(n)
+                        self.failures[n] = f"timed out after {now - start:.0f}s"
+                    continue
+                if name not in running:
+                    continue
+                if isinstance(payload, list):
+                    yield from payload
+                    continue
+                running.discard(name)
+                if payload is not None:
+                    self.failures[name] = payload
+        finally:
+            for event in cancelled.values():
+                event.set()
+        for name, reason in self.failures.items():
+            print(f"provider {name} failed: {reason}", file=sys.stderr)
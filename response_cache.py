@@ -0,0 +1,58 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_DIR = '.price_cache'
+
+class ResponseCache:
+    """On-disk HTTP response cache keyed by URL.
+
+    Each entry is a gzip'd body plus a small JSON sidecar with the URL and
+    the ETag/Last-Modified validators, which are sent back as conditional
+    request headers so unchanged pages come back as 304s. In offline mode
+    callers read entries without touching the network.
+    """
+
+    def __init__(self, root=CACHE_DIR, offline=False):
+        self.root = root
+        self.offline = offline
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, url, ext):
+        return os.path.join(self.root, hashlib.sha256(url.encode('utf-8')).hexdigest() + ext)
+
+    def _meta(self, url):
+        try:
+            with open(self._path(url, '.meta'), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def conditional_headers(self, url):
+        meta = self._meta(url)
+        if not meta or not os.path.exists(self._path(url, '.body.gz')):
+            return {}
+        headers = {}
+        if meta.get('etag'): headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'): headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def load(self, url):
+        try:
+            with open(self._path(url, '.body.gz'), 'rb') as f:
+                return gzip.decompress(f.read())
+        except OSError:
+            return None
+
+    def store(self, url, body, etag=None, last_modified=None):
+        # Write-then-rename so concurrent crawl workers never see a torn entry.
+        for ext, data in ((".body.gz", gzip.compress(body)),
+                          (".meta", json.dumps({"url": url, "etag": etag, "last_modified": last_modified, "fetched_at": time.time()}).encode('utf-8'))):
+            path = self._path(url, ext)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
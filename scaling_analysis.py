@@ -1,19 +1,12 @@
 import json
 import math
-import csv
 import numpy as np
+from demand import load_demand
 
 # Load Data
-cities = []
-with open('cities.csv', mode='r') as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        row['population'] = int(row['population'])
-        row['latitude'] = float(row['latitude'])
-        row['longitude'] = float(row['longitude'])
-        cities.append(row)
+cities = load_demand()
 
-total_pop = sum(c['population'] for c in cities)
+total_pop = cities.total
 LATENCY_THRESHOLD_KM = 800.0 # ~5ms
 MIN_SERVERS_PER_CITY = 3 # 2-fault tolerance
 
@@ -34,14 +27,6 @@ EXPENSIVE_UNITS = 20.0
 #    With 30 optimal sites, most major cities are in range of 3+ sites.
 #    So we need at least 30 servers total (1 per site) to satisfy geo if they are well-placed.
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371 
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = math.sin(dlat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon/2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
-
 # Pre-selected 30 optimal sites from previous run
 # (Simplified: we use the top 30 cities by population as proxy sites)
 optimal_sites = cities[:30]
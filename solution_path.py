@@ -0,0 +1,86 @@
+import numpy as np
+from greedy import GreedyCoverage, coverage_with_each
+from matrix_cache import default_cache, digest
+
+class SolutionPath:
+    """A placement run once up to n_max, one server per step: sites[i] is
+    the server added at step i + 1, covered[i] the population covered k
+    times and cost[i] the hourly cost after it. Any prefix N is a slice, so
+    the N = 5..30 tables and "the N = 21 set" all read the same run.
+    """
+
+    def __init__(self, sites, covered, cost):
+        self.sites = sites
+        self.covered = covered
+        self.cost = cost
+
+    def __len__(self):
+        return len(self.sites)
+
+    def prefix(self, n):
+        """Sites selected after n steps, in the order they were added."""
+        return [int(s) for s in self.sites[:n]]
+
+    def covered_at(self, n):
+        return int(self.covered[n - 1]) if n else 0
+
+    def cost_at(self, n):
+        return float(self.cost[n - 1]) if n else 0.0
+
+def _arrays(sites, covered, prices):
+    cost, total = [], 0
+    for site in sites:
+        total += prices[site] if prices is not None else 0.0
+        cost.append(total)
+    return {"sites": np.array(sites, dtype=np.int64), "covered": np.array(covered, dtype=np.int64),
+            "cost": np.array(cost, dtype=np.float64)}
+
+def _cached(parts, run, cache):
+    cache = cache or default_cache()
+    arrays, _ = cache.cached(parts, lambda: (run(), None))
+    return SolutionPath(arrays["sites"], arrays["covered"], arrays["cost"])
+
+def _parts(engine, coverage, population, prices, k, n_max, sync, **extra):
+    return {"kind": "path", "engine": engine, "coverage": digest(coverage.bits), "num_cities": coverage.num_cities,
+            "population": digest(population), "prices": digest(prices) if prices is not None else None,
+            "k": k, "n_max": n_max, "sync": digest(sync) if sync is not None else None, **extra}
+
+def greedy_path(coverage, population, prices, k, n_max, weight=1.0, sync=None, cache=None):
+    """GreedyCoverage (gain * weight / price) run to n_max steps, stopping
+    early if no site is left to add; persisted in the matrix cache."""
+    prices = np.asarray(prices, dtype=np.float64)
+
+    def run():
+        greedy = GreedyCoverage(coverage, population, prices, k, weight, sync)
+        covered = []
+        for _ in range(n_max):
+            if greedy.step() == -1:
+                break
+            covered.append(greedy.covered)
+        return _arrays(greedy.selected, covered, prices)
+
+    return _cached(_parts("gain", coverage, population, prices, k, n_max, sync, weight=weight), run, cache)
+
+def coverage_path(coverage, population, k, n_max, prices=None, sync=None, cache=None):
+    """Greedy that adds, among the sites not yet used, the one leaving the
+    most population covered k times (lowest index on ties), run to n_max
+    steps or until no eligible site is left; persisted in the matrix cache."""
+    if prices is not None:
+        prices = np.asarray(prices, dtype=np.float64)
+
+    def run():
+        selected, covered = [], []
+        eligible = np.ones(len(coverage.bits), dtype=bool)
+        for _ in range(n_max):
+            pops = np.where(eligible, coverage_with_each(coverage, selected, population, k), -1)
+            if not len(pops) or pops.max() < 0:
+                break
+            best = int(np.argmax(pops))
+            selected.append(best)
+            eligible[best] = False
+            if sync is not None:
+                eligible &= sync[best]
+            covered.append(int(pops[best]))
+        return _arrays(selected, covered, prices)
+
+    return _cached(_parts("coverage", coverage, population, prices, k, n_max, sync), run, cache)
@@ -0,0 +1,173 @@
+import numpy as np
+from geo import EARTH_RADIUS_KM, haversine
+
+# Cities whose candidate pairs are expanded at once by GridIndex.pairs.
+PAIR_CHUNK = 1024
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+def chord(km):
+    """Straight-line distance between two points on the unit sphere that are
+    `km` apart along the surface."""
+    return 2 * np.sin(min(km / EARTH_RADIUS_KM, np.pi) / 2)
+
+class GridIndex:
+    """Uniform grid over the points' unit-sphere (x, y, z) coordinates.
+
+    Cells are one query radius (as a chord) wide, so every point within the
+    radius of a query lies in the 27 cells around it; only those are
+    visited and the candidates are then checked with the exact haversine
+    distance. Work scales with the pairs near each other rather than with
+    the full cross product.
+    """
+
+    def __init__(self, points, radius_km):
+        self.lat, self.lon = (np.asarray(p, dtype=np.float64) for p in points)
+        self.radius_km = radius_km
+        # Slack so rounding in the chord never drops a pair haversine keeps.
+        self.cell = chord(radius_km) * (1 + 1e-9) + 1e-12
+        self.span = int(np.ceil(1 / self.cell)) + 2
+        self.xyz = unit_vectors(self.lat, self.lon)
+        cells = self._cells(self.xyz)
+        keys = self._key(cells)
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+
+    def _cells(self, xyz):
+        return np.floor(xyz / self.cell).astype(np.int64)
+
+    def _key(self, cells):
+        m = 2 * self.span + 1
+        c = cells + self.span
+        return (c[..., 0] * m + c[..., 1]) * m + c[..., 2]
+
+    def _candidates(self, lat, lon, xyz=None):
+        """(query, point) index arrays of every point in the 27 cells around
+        each query."""
+        cells = self._cells(unit_vectors(lat, lon) if xyz is None else xyz)
+        queries, found = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    keys = self._key(cells + np.array([dx, dy, dz]))
+                    lo = np.searchsorted(self.keys, keys, 'left')
+                    n = np.searchsorted(self.keys, keys, 'right') - lo
+                    total = int(n.sum())
+                    if not total:
+                        continue
+                    starts = np.repeat(lo - np.cumsum(n) + n, n)
+                    queries.append(np.repeat(np.arange(len(lat)), n))
+                    found.append(self.order[starts + np.arange(total)])
+        if not queries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(queries), np.concatenate(found)
+
+    def query(self, lat, lon):
+        """Indices of the points within the radius of (lat, lon), ascending."""
+        _, found = self._candidates(np.array([lat], dtype=np.float64), np.array([lon], dtype=np.float64))
+        d = haversine(lat, lon, self.lat[found], self.lon[found])
+        return np.sort(found[d <= self.radius_km])
+
+    def iter_pairs(self, points):
+        """(query, point) index arrays of the pairs within the radius for the
+        (lat, lon) query arrays in `points`, PAIR_CHUNK queries at a time."""
+        lat, lon = (np.asarray(p, dtype=np.float64) for p in points)
+        xyz = unit_vectors(lat, lon)
+        # Pairs clearly inside or outside by chord length skip the haversine;
+        # only the thin band around the radius is checked exactly.
+        inner = (chord(self.radius_km) * (1 - 1e-9)) ** 2
+        outer = self.cell ** 2
+        for start in range(0, len(lat), PAIR_CHUNK):
+            rows = slice(start, start + PAIR_CHUNK)
+            q, f = self._candidates(lat[rows], lon[rows], xyz[rows])
+            q += start
+            d2 = ((xyz[q] - self.xyz[f]) ** 2).sum(axis=1)
+            keep = d2 < inner
+            edge = np.flatnonzero((d2 >= inner) & (d2 <= outer))
+            keep[edge] = haversine(lat[q[edge]], lon[q[edge]], self.lat[f[edge]], self.lon[f[edge]]) <= self.radius_km
+            yield q[keep], f[keep]
+
+    def pairs(self, points):
+        """All (query, point) index pairs within the radius."""
+        chunks = list(self.iter_pairs(points))
+        queries, found = [q for q, _ in chunks], [f for _, f in chunks]
+        if not queries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return np.concatenate(queries), np.concatenate(found)
+
+class NeighborLists:
+    """Every (city, site) pair within max_km, sorted by distance both ways.
+
+    City i's sites are site_idx[city_ptr[i]:city_ptr[i + 1]], nearest first,
+    with their distances in city_dist; site_ptr/city_idx/site_dist hold the
+    same pairs grouped by site. Distances are float32, so answers that land
+    within float32 rounding of the threshold are settled with the exact
+    haversine; everything else is a binary search (per row) or one
+    comparison (whole matrix), and any threshold up to max_km reuses the
+    same lists.
+    """
+
+    ARRAYS = ["city_lat", "city_lon", "site_lat", "site_lon",
+              "city_ptr", "site_idx", "city_dist", "site_ptr", "city_idx", "site_dist"]
+
+    def __init__(self, max_km, **arrays):
+        self.max_km = max_km
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    @classmethod
+    def build(cls, cities, sites, max_km):
+        """Lists for `cities` x `sites` ((lat, lon) array pairs)."""
+        city_lat, city_lon = (np.asarray(p, dtype=np.float64) for p in cities)
+        site_lat, site_lon = (np.asarray(p, dtype=np.float64) for p in sites)
+        c, s = GridIndex((site_lat, site_lon), max_km).pairs((city_lat, city_lon))
+        d = haversine(city_lat[c], city_lon[c], site_lat[s], site_lon[s]).astype(np.float32)
+        arrays = {"city_lat": city_lat, "city_lon": city_lon, "site_lat": site_lat, "site_lon": site_lon}
+        for major, minor, n, prefix in ((c, s, len(city_lat), "city"), (s, c, len(site_lat), "site")):
+            # Non-negative float32 bit patterns sort like the values, so one
+            # integer sort on (row, distance) replaces a much slower lexsort.
+            order = np.argsort((major.astype(np.uint64) << np.uint64(32)) | d.view(np.uint32).astype(np.uint64), kind='stable')
+            other = "site" if prefix == "city" else "city"
+            arrays[f"{prefix}_ptr"] = np.concatenate([[0], np.cumsum(np.bincount(major, minlength=n))]).astype(np.int64)
+            arrays[f"{other}_idx"] = minor[order].astype(np.int32)
+            arrays[f"{prefix}_dist"] = d[order]
+        return cls(max_km, **arrays)
+
+    @property
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def _check(self, km):
+        if km > self.max_km:
+            raise ValueError(f"threshold {km} km is beyond the {self.max_km} km these lists were built for")
+
+    def _within(self, ptr, idx, dist, row, km, exact):
+        self._check(km)
+        lo, hi = ptr[row], ptr[row + 1]
+        d = dist[lo:hi]
+        sure = lo + np.searchsorted(d, km * (1 - 1e-6), 'right')
+        maybe = lo + np.searchsorted(d, km * (1 + 1e-6), 'right')
+        edge = idx[sure:maybe]
+        return np.sort(np.concatenate([idx[lo:sure], edge[exact(edge) <= km]]))
+
+    def sites_within(self, city, km):
+        """Sites within km of `city`, ascending index."""
+        return self._within(self.city_ptr, self.site_idx, self.city_dist, city, km,
+                            lambda s: haversine(self.city_lat[city], self.city_lon[city], self.site_lat[s], self.site_lon[s]))
+
+    def cities_within(self, site, km):
+        """Cities within km of `site`, ascending index."""
+        return self._within(self.site_ptr, self.city_idx, self.site_dist, site, km,
+                            lambda c: haversine(self.city_lat[c], self.city_lon[c], self.site_lat[site], self.site_lon[site]))
+
+    def pairs(self, km):
+        """(city, site) index arrays of every pair within km."""
+        self._check(km)
+        cities = np.repeat(np.arange(len(self.city_ptr) - 1), np.diff(self.city_ptr))
+        keep = self.city_dist <= km * (1 + 1e-6)
+        edge = np.flatnonzero(keep & (self.city_dist >= km * (1 - 1e-6)))
+        c, s = cities[edge], self.site_idx[edge]
+        keep[edge] = haversine(self.city_lat[c], self.city_lon[c], self.site_lat[s], self.site_lon[s]) <= km
+        return cities[keep], self.site_idx[keep].astype(np.int64)
@@ -0,0 +1,147 @@
+import os
+# One BLAS thread per worker; the sweep parallelises across scenarios.
+for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(var, "1")
+
+import argparse
+import csv
+import itertools
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from compute_optimizer import VENDOR_RISKS
+from demand import load_demand
+from geo import latlon
+from greedy import GreedyCoverage, VendorCoverage, sync_mask
+from matrix_cache import site_coverage
+from packed_coverage import PackedCoverage
+
+COLUMNS = ["threshold_km", "k", "max_risk", "min_vendors", "sync_km", "n",
+           "coverage_pct", "monthly_cost", "last_site"]
+
+def with_risk(site):
+    return dict(site, risk=VENDOR_RISKS.get(site['supplier'], 0.5))
+
+def scenario_grid(thresholds, ks, max_risks, min_vendors, sync_kms, ns):
+    """Scenarios as dicts, one per combination; the N values of a scenario
+    are all answered by one greedy run up to the largest."""
+    return [{"threshold_km": t, "k": k, "max_risk": r, "min_vendors": v, "sync_km": s, "n": sorted(ns)}
+            for t, k, r, v, s in itertools.product(thresholds, ks, max_risks, min_vendors, sync_kms)]
+
+def share(arrays):
+    """Copy arrays into named shared memory blocks. Returns the blocks (keep
+    them alive, unlink when done) and the specs workers attach with."""
+    blocks, specs = [], {}
+    for name, a in arrays.items():
+        a = np.ascontiguousarray(a)
+        shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+        np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+        blocks.append(shm)
+        specs[name] = (shm.name, a.shape, a.dtype.str)
+    return blocks, specs
+
+_shared = {}
+_blocks = []
+
+def attach(specs, meta):
+    """Worker initializer: map the shared arrays without copying them."""
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _blocks.append(shm)
+        _shared[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _shared.update(meta)
+
+def run_scenario(scenario):
+    """Greedy placement for one scenario; one result row per requested N."""
+    population, prices = _shared["population"], _shared["prices"]
+    cov = PackedCoverage(_shared[f"bits_{scenario['threshold_km']}"], len(population))
+    sync = _shared[f"sync_{scenario['sync_km']}"] if scenario['sync_km'] else None
+    if scenario['min_vendors'] > 1:
+        state = VendorCoverage(cov, _shared["vendors"], population, scenario['k'], scenario['min_vendors'], sync=sync)
+        score = lambda: np.where(state.feasible, state.gains(50) / np.where(prices > 0, prices, 0.0001), -np.inf)
+    else:
+        state = GreedyCoverage(cov, population, prices, scenario['k'], sync=sync)
+        score = state.scores
+    state.feasible &= _shared["risks"] <= scenario['max_risk']
+    total = int(population.sum())
+    rows = []
+    for n in range(1, scenario['n'][-1] + 1):
+        scores = score()
+        site = int(np.argmax(scores)) if state.feasible.any() else -1
+        if site == -1:
+            break
+        state.add(site)
+        if n in scenario['n']:
+            rows.append({**{c: scenario[c] for c in COLUMNS[:5]}, "n": n,
+                         "coverage_pct": round(state.covered / total * 100, 4),
+                         "monthly_cost": round(float(prices[state.selected].sum()) * 24 * 30, 2),
+                         "last_site": _shared["names"][site]})
+    return rows
+
+def sweep(cities, category, scenarios, workers=None):
+    """Run `scenarios` across worker processes, yielding result rows as
+    each scenario finishes. The site catalog, population and one coverage
+    bitset matrix per threshold (all derived from the same cached neighbor
+    lists) are placed in shared memory once and mapped by every worker."""
+    arrays = {"population": cities.population}
+    sites = None
+    thresholds = sorted({s['threshold_km'] for s in scenarios})
+    for km in thresholds:
+        sites, cov = site_coverage(cities, category, km, prepare=with_risk, params=VENDOR_RISKS, reach_km=thresholds[-1])
+        arrays[f"bits_{km}"] = cov.bits
+    arrays["prices"] = np.array([s['price'] for s in sites], dtype=np.float64)
+    arrays["risks"] = np.array([s['risk'] for s in sites], dtype=np.float64)
+    arrays["vendors"] = np.array([s['supplier'] for s in sites], dtype=str)
+    for km in sorted({s['sync_km'] for s in scenarios if s['sync_km']}):
+        arrays[f"sync_{km}"] = sync_mask(latlon(sites), km)
+    names = [f"{s['supplier']} ({s['region']})" for s in sites]
+
+    blocks, specs = share(arrays)
+    try:
+        with ProcessPoolExecutor(workers, initializer=attach, initargs=(specs, {"names": names})) as pool:
+            futures = [pool.submit(run_scenario, s) for s in scenarios]
+            for future in as_completed(futures):
+                yield from future.result()
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+def _floats(text):
+    return [float(x) for x in text.split(",") if x]
+
+def _ints(text):
+    return [int(x) for x in text.split(",") if x]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of greedy placement scenarios across all cores")
+    parser.add_argument("--category", default="cpu")
+    parser.add_argument("--thresholds", default="150,800,1000", help="latency radii in km")
+    parser.add_argument("--k", default="3,4", help="redundancy levels")
+    parser.add_argument("--max-risk", default="0.5,1.0", help="vendor risk caps")
+    parser.add_argument("--min-vendors", default="1,2", help="distinct vendors required per city")
+    parser.add_argument("--sync-km", default="0,4000", help="max distance between servers (0 = unconstrained)")
+    parser.add_argument("--n", default="10,25,50,100,200,300", help="server counts to report")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--out", help="also write the table as CSV")
+    args = parser.parse_args()
+
+    scenarios = scenario_grid(_floats(args.thresholds), _ints(args.k), _floats(args.max_risk),
+                              _ints(args.min_vendors), _floats(args.sync_km), _ints(args.n))
+    print(f"{len(scenarios)} scenarios x {len(_ints(args.n))} N values", file=sys.stderr)
+    out = open(args.out, "w", newline="") if args.out else None
+    writer = csv.DictWriter(out, COLUMNS) if out else None
+    if writer:
+        writer.writeheader()
+    print(f"{'km':>6} | {'k':>2} | {'risk':>5} | {'vend':>4} | {'sync':>6} | {'N':>3} | {'Coverage %':>10} | {'Monthly':>11} | Last site")
+    try:
+        for row in sweep(load_demand(), args.category, scenarios, args.workers):
+            print(f"{row['threshold_km']:6.0f} | {row['k']:2} | {row['max_risk']:5.2f} | {row['min_vendors']:4} | {row['sync_km']:6.0f} | "
+                  f"{row['n']:3} | {row['coverage_pct']:9.2f}% | ${row['monthly_cost']:10.2f} | {row['last_site']}", flush=True)
+            if writer:
+                writer.writerow(row)
+                out.flush()
+    finally:
+        if out:
+            out.close()
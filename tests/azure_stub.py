@@ -0,0 +1,100 @@
+import hashlib
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_SIZE = 100
+PATH = "/api/retail/prices"
+
+SERVICES = ["Virtual Machines", "Storage", "Backup"]
+REGIONS = ["eastus", "westus2", "centralus", "canadacentral"]
+
+def catalog(n=250):
+    """A recorded-style slice of the Azure Retail Prices catalog: n
+    Consumption meters spread over a few services and regions."""
+    items = []
+    for i in range(n):
+        service = SERVICES[i % len(SERVICES)]
+        sku = f"Standard_NC{i}" if service == "Virtual Machines" and i % 2 else f"Standard_D{i}_v5"
+        items.append({"serviceName": service, "armRegionName": REGIONS[i % len(REGIONS)],
+                      "armSkuName": sku if service == "Virtual Machines" else f"{service} {i}",
+                      "retailPrice": round(0.01 + 0.013 * i, 4), "type": "Consumption"})
+    return items
+
+class AzureStub:
+    """Local stand-in for the Azure Retail Prices API, for crawl tests.
+
+    Serves `items` 100 per page with $skip offsets and NextPageLink chains,
+    honours `serviceName eq '...'` partitions, sends ETags and answers
+    If-None-Match with 304. `failures` maps a page number (skip // 100) to
+    how many times it answers 503 before succeeding (-1: always).
+    """
+
+    def __init__(self, items=None, failures=None):
+        self.items = catalog() if items is None else items
+        self.failures = dict(failures or {})
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}{PATH}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _page(self, query):
+        params = urllib.parse.parse_qs(query)
+        flt = params.get("$filter", [""])[0]
+        skip = int(params.get("$skip", ["0"])[0])
+        items = self.items
+        if " and serviceName eq " in flt:
+            service = flt.split(" and serviceName eq ", 1)[1].strip("'").replace("''", "'")
+            items = [it for it in items if it["serviceName"] == service]
+        page = items[skip:skip + PAGE_SIZE]
+        next_link = None
+        if skip + PAGE_SIZE < len(items):
+            next_query = urllib.parse.quote(f"$filter={flt}&$skip={skip + PAGE_SIZE}", safe="=$&")
+            next_link = f"{self.url}?{next_query}"
+        return skip // PAGE_SIZE, {"BillingCurrency": "USD", "Items": page, "NextPageLink": next_link, "Count": len(page)}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                if path != PATH:
+                    return self._send(404)
+                page, data = stub._page(query)
+                with stub.lock:
+                    stub.requests.append(self.path)
+                    left = stub.failures.get(page, 0)
+                    if left:
+                        stub.failures[page] = left - 1 if left > 0 else left
+                if left:
+                    return self._send(503, b"busy", [("Retry-After", "0")])
+                body = json.dumps(data).encode("utf-8")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, headers=[("ETag", etag)])
+                self._send(200, body, [("Content-Type", "application/json"), ("ETag", etag)])
+
+        return Handler
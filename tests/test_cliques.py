@@ -0,0 +1,69 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from cliques import CliqueSelection, adjacency_bits, maximal_cliques
+from packed_coverage import PackedCoverage
+
+def random_graph(rng, n):
+    adj = rng.random((n, n)) < rng.uniform(0.1, 0.9)
+    adj = adj | adj.T
+    np.fill_diagonal(adj, True)
+    return adj
+
+def brute_force_cliques(adj):
+    n = len(adj)
+    cliques = [set(c) for size in range(1, n + 1) for c in combinations(range(n), size)
+               if all(adj[i, j] for i, j in combinations(c, 2))]
+    return sorted(sorted(c) for c in cliques if not any(c < other for other in cliques))
+
+@pytest.mark.parametrize("seed", range(40))
+def test_maximal_cliques_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    adj = random_graph(rng, int(rng.integers(1, 12)))
+    assert maximal_cliques(adjacency_bits(adj)) == brute_force_cliques(adj)
+
+def test_maximal_cliques_edge_cases():
+    assert maximal_cliques(adjacency_bits(np.eye(3, dtype=bool))) == [[0], [1], [2]]
+    assert maximal_cliques(adjacency_bits(np.ones((4, 4), dtype=bool))) == [[0, 1, 2, 3]]
+    assert maximal_cliques([]) == [[]]
+
+def uncached_selection(mask, population, clique, k, n):
+    """The per-N loop CliqueSelection replaced: greedy from scratch for
+    every N, scoring each candidate by the population covered k times."""
+    def coverage_of(sites):
+        if len(sites) < k:
+            return 0
+        return int(population[mask[:, sites].sum(axis=1) >= k].sum())
+
+    if len(clique) <= n:
+        return coverage_of(clique), clique
+    selected = []
+    for _ in range(n):
+        best_s, best_pop = -1, -1
+        for s in clique:
+            if s in selected:
+                continue
+            pop = coverage_of(selected + [s])
+            if pop > best_pop:
+                best_pop, best_s = pop, s
+        selected.append(best_s)
+    return coverage_of(selected), selected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_clique_selection_matches_uncached_loop(seed):
+    rng = np.random.default_rng(seed)
+    num_cities, num_sites = int(rng.integers(1, 150)), int(rng.integers(3, 20))
+    mask = rng.random((num_cities, num_sites)) < rng.uniform(0.1, 0.7)
+    population = rng.integers(1, 1000, num_cities)
+    coverage = PackedCoverage.from_mask(mask)
+    k = int(rng.integers(1, 4))
+    clique = sorted(rng.choice(num_sites, int(rng.integers(1, num_sites + 1)), replace=False).tolist())
+    state = CliqueSelection(coverage, population, clique, k)
+    for n in range(1, len(clique) + 3):
+        if len(clique) <= n:
+            got = state.full_pop, state.clique
+        else:
+            got = state.extend(n)
+        assert (int(got[0]), list(got[1])) == uncached_selection(mask, population, clique, k, n)
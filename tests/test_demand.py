@@ -0,0 +1,67 @@
+import gzip
+
+import numpy as np
+import pytest
+
+from demand import load_demand, read_demand
+from matrix_cache import MatrixCache
+
+CITIES_CSV = """city,state,population,latitude,longitude
+New York,NY,8336817,40.7128,-74.0060
+Los Angeles,CA,3979576,34.0522,-118.2437
+Chicago,IL,,41.8781,-87.6298
+Houston,TX,2320268,29.7604,-95.3698
+"""
+
+# 2010 Gazetteer places layout; the last header has trailing blanks.
+GAZETTEER_2010 = ("USPS\tGEOID\tANSICODE\tNAME\tLSAD\tFUNCSTAT\tPOP10\tHU10\tALAND\tAWATER\t"
+                  "ALAND_SQMI\tAWATER_SQMI\tINTPTLAT\tINTPTLONG     \n"
+                  "AL\t0100124\t02403054\tAbbeville city\t25\tA\t2688\t1255\t40255563\t107110\t"
+                  "15.543\t0.041\t31.566367\t-85.251300\n"
+                  "AL\t0100460\t02403063\tAdamsville city\t25\tA\t4522\t1990\t65205364\t9005\t"
+                  "25.176\t0.003\t33.590411\t-86.949166\n")
+
+GAZETTEER_2020 = ("USPS\tGEOID\tANSICODE\tNAME\tLSAD\tFUNCSTAT\tALAND\tAWATER\tALAND_SQMI\tAWATER_SQMI\t"
+                  "INTPTLAT\tINTPTLONG\n"
+                  "AL\t0100124\t02403054\tAbbeville city\t25\tA\t40255563\t107110\t15.543\t0.041\t31.566367\t-85.251300\n")
+
+def test_csv_skips_rows_without_population(tmp_path, capsys):
+    path = tmp_path / "cities.csv"
+    path.write_text(CITIES_CSV)
+    d = read_demand(str(path))
+    assert list(d.names) == ["New York", "Los Angeles", "Houston"]
+    assert d.population.dtype == np.int64 and d.total == 8336817 + 3979576 + 2320268
+    assert d.lat.dtype == np.float32
+    np.testing.assert_allclose(d.lon, [-74.0060, -118.2437, -95.3698], rtol=1e-6)
+    assert "skipped 1 rows" in capsys.readouterr().err
+
+@pytest.mark.parametrize("gz", [False, True])
+def test_gazetteer_2010_tab_separated(tmp_path, gz):
+    path = tmp_path / ("places.txt.gz" if gz else "places.txt")
+    if gz:
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(GAZETTEER_2010)
+    else:
+        path.write_text(GAZETTEER_2010)
+    d = read_demand(str(path))
+    assert list(d.names) == ["Abbeville city", "Adamsville city"]
+    assert list(d.population) == [2688, 4522]
+    np.testing.assert_allclose(d.points()[0], [31.566367, 33.590411], rtol=1e-6)
+    np.testing.assert_allclose(d.points()[1], [-85.251300, -86.949166], rtol=1e-6)
+
+def test_gazetteer_2020_needs_a_population_join(tmp_path):
+    path = tmp_path / "places2020.txt"
+    path.write_text(GAZETTEER_2020)
+    with pytest.raises(ValueError, match="join one in on GEOID"):
+        read_demand(str(path))
+
+def test_load_demand_caches_columns(tmp_path):
+    path = tmp_path / "cities.csv"
+    path.write_text(CITIES_CSV)
+    cache = MatrixCache(str(tmp_path / "cache"))
+    first = load_demand(str(path), cache)
+    path.write_text(CITIES_CSV)  # same content, same key
+    second = load_demand(str(path), cache)
+    assert isinstance(second.population, np.memmap)
+    assert list(second.names) == list(first.names)
+    assert second.total == first.total
@@ -0,0 +1,86 @@
+import csv
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+from azure_stub import AzureStub
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def fetch(cwd, stub, *args):
+    """Run fetch_prices.py end to end against the stub, in `cwd`."""
+    env = dict(os.environ, PYTHONPATH=REPO)
+    return subprocess.run([sys.executable, os.path.join(REPO, "fetch_prices.py"), "--providers", "azure",
+                           "--base-url", stub.url, *args], cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+
+def csv_rows(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def test_deep_crawl_writes_every_sink(tmp_path):
+    with AzureStub() as stub:
+        result = fetch(tmp_path, stub, "--no-cache")
+    assert result.returncode == 0, result.stderr
+    assert "Total entries: 250" in result.stdout
+    rows = csv_rows(tmp_path / "prices.csv")
+    assert len(rows) == 250
+    assert {r["category"] for r in rows} == {"cpu", "gpu", "storage", "backup"}
+    conn = sqlite3.connect(tmp_path / "prices.db")
+    assert conn.execute("SELECT COUNT(*) FROM instances").fetchone()[0] == 250
+    conn.close()
+    assert (tmp_path / "prices.bin").stat().st_size > 0
+    assert not (tmp_path / ".crawl_checkpoint.json").exists()
+
+def test_concurrent_crawl_retries_503(tmp_path):
+    with AzureStub(failures={1: 2}) as stub:
+        result = fetch(tmp_path, stub, "--no-cache", "--concurrent", "--workers", "4", "--retries", "3",
+                       "--metrics-json", "metrics.json")
+        retried = [r for r in stub.requests if "$skip=100" in r]
+    assert result.returncode == 0, result.stderr
+    assert len(csv_rows(tmp_path / "prices.csv")) == 250
+    assert len(retried) == 3
+    with open(tmp_path / "metrics.json") as f:
+        metrics = json.load(f)
+    assert metrics["retries"] == 2
+
+def test_partitioned_crawl_revalidates_from_cache(tmp_path):
+    args = ("--concurrent", "--partition-by", "serviceName", "--partitions", "Virtual Machines,Storage,Backup",
+            "--metrics-json", "metrics.json")
+    with AzureStub() as stub:
+        assert fetch(tmp_path, stub, *args).returncode == 0
+        result = fetch(tmp_path, stub, *args)
+    assert result.returncode == 0, result.stderr
+    assert len(csv_rows(tmp_path / "prices.csv")) == 250
+    with open(tmp_path / "metrics.json") as f:
+        metrics = json.load(f)
+    assert metrics["pages_by_source"] == {"revalidated": 3}
+
+def test_exhausted_retries_keep_the_previous_outputs(tmp_path):
+    with AzureStub() as stub:
+        assert fetch(tmp_path, stub).returncode == 0
+        before = {name: (tmp_path / name).read_bytes() for name in ("prices.csv", "prices.hpp", "prices.bin")}
+        stub.failures = {1: -1}
+        result = fetch(tmp_path, stub, "--retries", "1")
+        assert result.returncode == 1
+        assert "failed after 2 attempts: HTTP 503" in result.stderr
+        assert "Crawl incomplete" in result.stderr
+        assert {name: (tmp_path / name).read_bytes() for name in before} == before
+        assert not list(tmp_path.glob("*.partial"))
+        assert (tmp_path / ".crawl_checkpoint.json").exists()
+
+        stub.failures = {}
+        result = fetch(tmp_path, stub, "--resume", "--metrics-json", "metrics.json")
+    assert result.returncode == 0, result.stderr
+    with open(tmp_path / "metrics.json") as f:
+        assert json.load(f)["pages_by_source"] == {"cache": 1, "revalidated": 2}
+    assert not (tmp_path / ".crawl_checkpoint.json").exists()
+
+def test_delta_refresh_only_writes_changes(tmp_path):
+    with AzureStub() as stub:
+        first = fetch(tmp_path, stub, "--no-cache", "--delta")
+        stub.items[0] = dict(stub.items[0], retailPrice=9.99)
+        second = fetch(tmp_path, stub, "--no-cache", "--delta")
+    assert "250 rows inserted/updated" in first.stdout, first.stderr
+    assert "1 rows inserted/updated, 0 stale rows removed, 1 price changes recorded" in second.stdout, second.stderr
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from greedy import GreedyCoverage, VendorCoverage, coverage_with_each, score_sites
+from packed_coverage import PackedCoverage
+
+def random_case(rng, sync=False):
+    num_cities, num_sites = int(rng.integers(1, 200)), int(rng.integers(1, 40))
+    mask = rng.random((num_cities, num_sites)) < rng.uniform(0.05, 0.6)
+    population = rng.integers(1, 100_000, num_cities)
+    prices = rng.uniform(0, 2, num_sites).round(3)
+    prices[rng.random(num_sites) < 0.15] = 0
+    mutual = None
+    if sync:
+        mutual = rng.random((num_sites, num_sites)) < 0.6
+        mutual = mutual & mutual.T
+        np.fill_diagonal(mutual, True)
+    return mask, population, prices, mutual
+
+def dense_greedy(mask, population, prices, k, steps, weight=1.0, sync=None):
+    """The per-script loop GreedyCoverage replaced: rescore every site over
+    every city at every step."""
+    counts = np.zeros(mask.shape[0], dtype=np.int64)
+    feasible = np.ones(mask.shape[1], dtype=bool)
+    selected, covered = [], []
+    for _ in range(steps):
+        if not feasible.any():
+            break
+        best, best_score = -1, -np.inf
+        for i in range(mask.shape[1]):
+            if not feasible[i]:
+                continue
+            gain = sum(int((counts[j] + 1) * population[j]) for j in range(mask.shape[0]) if mask[j, i] and counts[j] < k)
+            score = gain * weight / (prices[i] if prices[i] > 0 else 0.0001)
+            if score > best_score:
+                best, best_score = i, score
+        selected.append(best)
+        counts += mask[:, best]
+        if sync is not None:
+            feasible &= sync[best]
+        covered.append(int(population[counts >= k].sum()))
+    return selected, covered
+
+@pytest.mark.parametrize("seed", range(30))
+def test_packed_coverage_matches_dense(seed):
+    rng = np.random.default_rng(seed)
+    mask, population, _, _ = random_case(rng)
+    cov = PackedCoverage.from_mask(mask)
+    assert cov.shape == mask.shape
+    np.testing.assert_array_equal(cov.to_mask(), mask)
+    np.testing.assert_array_equal(cov.dot(population), mask.T.astype(np.int64) @ population)
+    values = rng.normal(size=mask.shape[0])
+    np.testing.assert_allclose(cov.dot(values), mask.T @ values)
+    # Restricting to some words is exact when values vanish elsewhere.
+    words = np.unique(rng.integers(0, cov.bits.shape[1], 2))
+    sparse = np.zeros(mask.shape[0], dtype=np.int64)
+    for w in words:
+        sparse[w * 64:(w + 1) * 64] = population[w * 64:(w + 1) * 64]
+    np.testing.assert_array_equal(cov.dot(sparse, words), mask.T.astype(np.int64) @ sparse)
+    # A cities x n matrix of values, with and without words.
+    block = np.stack([population, sparse, population // 7], axis=1)
+    np.testing.assert_array_equal(cov.dot(block), mask.T.astype(np.int64) @ block)
+    np.testing.assert_array_equal(cov.dot(block * (sparse > 0)[:, None], words),
+                                  mask.T.astype(np.int64) @ (block * (sparse > 0)[:, None]))
+    sites = list(rng.integers(0, mask.shape[1], 6))
+    counts = mask[:, sites].sum(axis=1)
+    np.testing.assert_array_equal(cov.counts(sites), counts)
+    for k in range(4):
+        np.testing.assert_array_equal(cov.unpack(cov.at_least(sites, k)), counts >= k)
+    city, site = int(rng.integers(mask.shape[0])), int(rng.integers(mask.shape[1]))
+    np.testing.assert_array_equal(cov.cities(site), np.flatnonzero(mask[:, site]))
+    np.testing.assert_array_equal(cov.sites(city), np.flatnonzero(mask[city]))
+    assert cov.covers(city, site) == mask[city, site]
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("sync", [False, True])
+def test_greedy_coverage_matches_dense_loop(seed, sync):
+    rng = np.random.default_rng(seed)
+    mask, population, prices, mutual = random_case(rng, sync)
+    k, weight, steps = int(rng.integers(1, 4)), float(rng.uniform(0.5, 2)), int(rng.integers(1, 25))
+    greedy = GreedyCoverage(PackedCoverage.from_mask(mask), population, prices, k, weight, mutual)
+    covered = []
+    for _ in range(steps):
+        if greedy.step() == -1:
+            break
+        covered.append(greedy.covered)
+        # The incrementally kept gains equal a fresh rescoring.
+        np.testing.assert_allclose(greedy.scores()[greedy.feasible],
+                                   score_sites(PackedCoverage.from_mask(mask), greedy.counts, population, prices, k, weight)[greedy.feasible])
+    expected, expected_covered = dense_greedy(mask, population, prices, k, steps, weight, mutual)
+    assert greedy.selected == expected
+    assert covered == expected_covered
+    np.testing.assert_array_equal(greedy.counts, mask[:, expected].sum(axis=1))
+
+@pytest.mark.parametrize("seed", range(20))
+def test_coverage_with_each(seed):
+    rng = np.random.default_rng(seed)
+    mask, population, _, _ = random_case(rng)
+    k = int(rng.integers(1, 4))
+    chosen = list(rng.integers(0, mask.shape[1], 4))
+    expected = [int(population[mask[:, chosen + [s]].sum(axis=1) >= k].sum()) for s in range(mask.shape[1])]
+    np.testing.assert_array_equal(coverage_with_each(PackedCoverage.from_mask(mask), chosen, population, k), expected)
+
+@pytest.mark.parametrize("seed", range(30))
+@pytest.mark.parametrize("sync", [False, True])
+def test_vendor_coverage_matches_dense(seed, sync):
+    rng = np.random.default_rng(seed)
+    mask, population, _, mutual = random_case(rng, sync)
+    vendors = rng.choice(["Azure", "AWS", "Vultr", "Hetzner"], mask.shape[1])
+    k, min_vendors, bonus = int(rng.integers(1, 4)), int(rng.integers(1, 3)), int(rng.integers(0, 60))
+    state = VendorCoverage(PackedCoverage.from_mask(mask), vendors, population, k, min_vendors, mutual)
+    feasible = np.ones(mask.shape[1], dtype=bool)
+    for _ in range(int(rng.integers(1, 15))):
+        chosen = state.selected
+        counts = mask[:, chosen].sum(axis=1)
+        has_vendor = np.stack([mask[:, [s for s in chosen if vendors[s] == v]].any(axis=1) for v in vendors], axis=1)
+        distinct = np.stack([mask[:, [s for s in chosen if vendors[s] == v]].any(axis=1) for v in np.unique(vendors)],
+                            axis=1).sum(axis=1)
+        needy = np.where((counts >= k) & (distinct >= min_vendors), 0, population)
+        expected = [int(needy[mask[:, s]].sum() + bonus * needy[mask[:, s] & ~has_vendor[:, s]].sum())
+                    for s in range(mask.shape[1])]
+        np.testing.assert_array_equal(state.gains(bonus), expected)
+        assert state.covered == int(population[(counts >= k) & (distinct >= min_vendors)].sum())
+        np.testing.assert_array_equal(state.feasible, feasible)
+        if not feasible.any():
+            break
+        site = int(rng.choice(np.flatnonzero(feasible)))
+        state.add(site)
+        if sync:
+            feasible &= mutual[site]
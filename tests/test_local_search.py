@@ -0,0 +1,67 @@
+from itertools import combinations, combinations_with_replacement
+
+import numpy as np
+import pytest
+
+from local_search import improve
+from packed_coverage import PackedCoverage
+
+def random_case(rng, distinct):
+    num_cities, num_sites = int(rng.integers(5, 120)), int(rng.integers(3, 14))
+    mask = rng.random((num_cities, num_sites)) < rng.uniform(0.1, 0.6)
+    population = rng.integers(1, 1000, num_cities)
+    prices = rng.uniform(0, 1, num_sites).round(2)
+    prices[rng.random(num_sites) < 0.1] = 0
+    sync = rng.random((num_sites, num_sites)) < 0.7
+    sync = sync & sync.T
+    np.fill_diagonal(sync, True)
+    allowed = rng.random(num_sites) < 0.8
+    # A start whose servers are all within sync range of each other.
+    selected, feasible = [], np.ones(num_sites, dtype=bool)
+    for _ in range(int(rng.integers(1, 8))):
+        open_sites = np.flatnonzero(feasible & ~np.isin(np.arange(num_sites), selected) if distinct else feasible)
+        if not len(open_sites):
+            break
+        site = int(rng.choice(open_sites))
+        selected.append(site)
+        feasible &= sync[site]
+    return mask, population, prices, sync, allowed, selected
+
+def covered(mask, population, sites, k):
+    return int(population[mask[:, sites].sum(axis=1) >= k].sum())
+
+def valid(mask, population, sites, start, k, need, sync, allowed, distinct):
+    added = list(sites)
+    for site in start:
+        if site in added:
+            added.remove(site)
+    return (covered(mask, population, sites, k) >= need and all(allowed[added])
+            and sync[np.ix_(sites, sites)].all() and (not distinct or len(set(sites)) == len(sites)))
+
+@pytest.mark.parametrize("seed", range(60))
+@pytest.mark.parametrize("distinct", [True, False])
+def test_improve_keeps_coverage_and_constraints(seed, distinct):
+    rng = np.random.default_rng(seed)
+    mask, population, prices, sync, allowed, selected = random_case(rng, distinct)
+    k = int(rng.integers(1, 4))
+    start = covered(mask, population, selected, k)
+    need = None if seed % 3 else int(start * rng.uniform(0.5, 1))
+    result = improve(PackedCoverage.from_mask(mask), population, prices, selected, k, min_covered=need,
+                     sync=sync, allowed=allowed, distinct=distinct, time_budget=10.0)
+    need = start if need is None else need
+    sites = result["sites"]
+    assert not result["timed_out"]
+    assert result["cost"] <= result["start_cost"] + 1e-12
+    assert result["cost"] == pytest.approx(prices[sites].sum())
+    assert result["covered"] == covered(mask, population, sites, k)
+    assert valid(mask, population, sites, selected, k, need, sync, allowed, distinct)
+
+    # No drop, swap or 2-swap left that saves money.
+    tol = 1e-9 * result["cost"]
+    for leave, enter in [(1, 0), (1, 1), (2, 2)]:
+        for out in combinations(range(len(sites)), leave):
+            kept = [s for p, s in enumerate(sites) if p not in out]
+            for add in combinations_with_replacement(range(mask.shape[1]), enter):
+                if prices[[sites[p] for p in out]].sum() - prices[list(add)].sum() > tol:
+                    assert not valid(mask, population, kept + list(add), kept, k, need, sync, allowed, distinct), \
+                        (out, add)
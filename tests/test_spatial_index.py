@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from geo import distance_matrix
+from packed_coverage import PackedCoverage
+from spatial_index import GridIndex, NeighborLists
+
+THRESHOLDS = [50.0, 150.0, 800.0, 1000.0, 2500.0]
+
+def points(rng, n):
+    """Random points, a third of them crowded around the antimeridian and
+    the poles, plus some exact repeats."""
+    lat = rng.uniform(-90, 90, n)
+    lon = rng.uniform(-180, 180, n)
+    near = rng.random(n)
+    lon = np.where(near < 0.15, rng.choice([-179.95, 179.95], n) + rng.normal(0, 0.3, n), lon)
+    lon = (lon + 180) % 360 - 180
+    lat = np.where((near >= 0.15) & (near < 0.3), rng.choice([-1, 1], n) * (90 - rng.uniform(0, 3, n)), lat)
+    dup = rng.random(n) < 0.05
+    lat[dup], lon[dup] = lat[0], lon[0]
+    return lat, lon
+
+def pair_set(c, s):
+    return set(zip(np.asarray(c).tolist(), np.asarray(s).tolist()))
+
+@pytest.mark.parametrize("seed", range(8))
+def test_grid_index_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    cities, sites = points(rng, 300), points(rng, 120)
+    dist = distance_matrix(cities, sites)
+    for km in THRESHOLDS:
+        index = GridIndex(sites, km)
+        assert pair_set(*index.pairs(cities)) == pair_set(*np.nonzero(dist <= km))
+        for city in rng.integers(0, len(cities[0]), 5):
+            np.testing.assert_array_equal(index.query(cities[0][city], cities[1][city]), np.flatnonzero(dist[city] <= km))
+
+def test_antimeridian_and_pole_pairs():
+    cities = (np.array([0.0, 89.99, -89.99, 10.0]), np.array([179.99, 0.0, 45.0, -179.99]))
+    sites = (np.array([0.0, 89.99, -89.99]), np.array([-179.99, 180.0, -135.0]))
+    pairs = pair_set(*GridIndex(sites, 50.0).pairs(cities))
+    # Across the antimeridian, and across each pole at a different longitude.
+    assert {(0, 0), (1, 1), (2, 2)} <= pairs
+    assert pairs == pair_set(*np.nonzero(distance_matrix(cities, sites) <= 50.0))
+
+@pytest.mark.parametrize("seed", range(6))
+def test_neighbor_lists_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    cities, sites = points(rng, 250), points(rng, 90)
+    dist = distance_matrix(cities, sites)
+    lists = NeighborLists.build(cities, sites, max(THRESHOLDS))
+    within = dist <= max(THRESHOLDS)
+    # CSR rows: exactly the pairs within max_km, nearest first, both ways.
+    np.testing.assert_array_equal(np.diff(lists.city_ptr), within.sum(axis=1))
+    np.testing.assert_array_equal(np.diff(lists.site_ptr), within.sum(axis=0))
+    for city in range(len(cities[0])):
+        row = slice(lists.city_ptr[city], lists.city_ptr[city + 1])
+        assert set(lists.site_idx[row].tolist()) == set(np.flatnonzero(within[city]).tolist())
+        np.testing.assert_allclose(lists.city_dist[row], dist[city, lists.site_idx[row]], rtol=1e-6, atol=1e-3)
+        assert np.all(np.diff(lists.city_dist[row]) >= 0)
+    for site in range(len(sites[0])):
+        row = slice(lists.site_ptr[site], lists.site_ptr[site + 1])
+        assert set(lists.city_idx[row].tolist()) == set(np.flatnonzero(within[:, site]).tolist())
+        assert np.all(np.diff(lists.site_dist[row]) >= 0)
+    for km in THRESHOLDS:
+        mask = dist <= km
+        assert pair_set(*lists.pairs(km)) == pair_set(*np.nonzero(mask))
+        np.testing.assert_array_equal(PackedCoverage.from_neighbors(lists, km).to_mask(), mask)
+        for city in rng.integers(0, len(cities[0]), 5):
+            np.testing.assert_array_equal(lists.sites_within(city, km), np.flatnonzero(mask[city]))
+        for site in rng.integers(0, len(sites[0]), 5):
+            np.testing.assert_array_equal(lists.cities_within(site, km), np.flatnonzero(mask[:, site]))
+
+def test_neighbor_lists_settle_the_threshold_exactly():
+    # A site exactly at the threshold distance of a city, up to float32.
+    cities = (np.array([40.0]), np.array([-100.0]))
+    sites = (np.array([40.0, 40.0, 40.0]), np.array([-100.0, -88.0, -88.0 + 1e-7]))
+    km = float(distance_matrix(cities, (sites[0][1:2], sites[1][1:2]))[0, 0])
+    lists = NeighborLists.build(cities, sites, 2000.0)
+    assert lists.sites_within(0, km).tolist() == [0, 1]
+    assert pair_set(*lists.pairs(km)) == {(0, 0), (0, 1)}
+    with pytest.raises(ValueError):
+        lists.pairs(2500.0)